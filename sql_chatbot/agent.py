@@ -1,171 +1,257 @@
 # type: ignore
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from langchain.chat_models import ChatOpenAI
-import json
+from openai import OpenAI
+import logging
 import re
+import textwrap
+import orjson
+import pandas as pd
+import pyarrow as pa
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from config import OPENAI_API_KEY, LLM_MODEL
+from db_utils import infer_type_from_name
+
+logger = logging.getLogger(__name__)
+
+# Operations the LLM may return; anything else is treated as "unknown"
+_OPERATIONS = frozenset({
+    "list_tables", "view_table", "count_records", "add_record", "delete_record",
+    "create_table_from_csv", "create_table", "add_column", "add_multiple_columns",
+    "delete_column", "rename_column", "rename_table", "update_row", "run_query",
+    "list_collections", "view_collection", "count_documents", "add_document",
+    "delete_document", "create_collection_from_csv", "create_collection",
+    "rename_collection", "update_document", "run_aggregation",
+})
+_UNCLEAR_EXPLANATION = "I couldn't understand the database operation from your query. Could you please rephrase?"
 
 class QueryAgent:
+    # Regular expressions are compiled once, when the class is defined
+    
+    # Unambiguous queries are matched locally before falling back to the LLM.
+    # Each pattern maps to a function building the parsed result from the match.
+    _FAST_PATTERNS = [
+        (re.compile(r'^\s*(?:list|show|display)\s+(?:all\s+)?(?:the\s+)?(?:postgres(?:ql)?\s+)?tables'
+                    r'(?:\s+in\s+postgres(?:ql)?)?\s*[.?!]?\s*$', re.I),
+         lambda m: {"operation": "list_tables", "target": "", "parameters": {},
+                    "explanation": "Listing all tables in PostgreSQL"}),
+        (re.compile(r'^\s*(?:list|show|display)\s+(?:all\s+)?(?:the\s+)?(?:mongo(?:db)?\s+)?collections'
+                    r'(?:\s+in\s+mongo(?:db)?)?\s*[.?!]?\s*$', re.I),
+         lambda m: {"operation": "list_collections", "target": "", "parameters": {},
+                    "explanation": "Listing all collections in MongoDB"}),
+        (re.compile(r'^\s*count\s+(?:all\s+)?(?:the\s+)?(?:records|rows)\s+(?:in|of|from)\s+(?:the\s+)?'
+                    r'(?:table\s+)?(\w+)(?:\s+table)?\s*[.?!]?\s*$', re.I),
+         lambda m: {"operation": "count_records", "target": m.group(1), "parameters": {},
+                    "explanation": f"Counting records in the {m.group(1)} table"}),
+        (re.compile(r'^\s*count\s+(?:all\s+)?(?:the\s+)?documents\s+(?:in|of|from)\s+(?:the\s+)?'
+                    r'(?:collection\s+)?(\w+)(?:\s+collection)?\s*[.?!]?\s*$', re.I),
+         lambda m: {"operation": "count_documents", "target": m.group(1), "parameters": {},
+                    "explanation": f"Counting documents in the {m.group(1)} collection"}),
+        (re.compile(r'^\s*(?:view|show|display)\s+(?:the\s+)?table\s+(\w+)\s*[.?!]?\s*$', re.I),
+         lambda m: {"operation": "view_table", "target": m.group(1), "parameters": {},
+                    "explanation": f"Viewing the contents of the {m.group(1)} table"}),
+        (re.compile(r'^\s*(?:view|show|display)\s+(?:the\s+)?collection\s+(\w+)\s*[.?!]?\s*$', re.I),
+         lambda m: {"operation": "view_collection", "target": m.group(1), "parameters": {},
+                    "explanation": f"Viewing the contents of the {m.group(1)} collection"}),
+        (re.compile(r'^\s*rename\s+(?:the\s+)?table\s+(\w+)\s+to\s+(\w+)\s*[.?!]?\s*$', re.I),
+         lambda m: {"operation": "rename_table", "target": m.group(1),
+                    "parameters": {"new_name": m.group(2)},
+                    "explanation": f"Renaming the {m.group(1)} table to {m.group(2)}"}),
+    ]
+    
+    # Upload keywords, matched case-insensitively in a single scan
+    _UPLOAD_RE = re.compile(
+        r'\b(?:upload(?:s|ed|ing)?|csvs?|files?|import(?:s|ed|ing)?|create\s+from)\b', re.I
+    )
+    
     def __init__(self):
-        """Initialize the query agent with LLM and prompt template"""
-        self.llm = ChatOpenAI(api_key=OPENAI_API_KEY, model=LLM_MODEL, temperature=0)
+        """Initialize the query agent with LLM and system prompt"""
+        self.client = OpenAI(api_key=OPENAI_API_KEY)
         
-        # Define a prompt template that helps the LLM understand database queries
-        self.prompt_template = PromptTemplate(
-            input_variables=["query"],
-            template="""
-            You are a database assistant that helps users interact with PostgreSQL and MongoDB databases.
-            Your task is to analyze the user's query and determine what database operation they want to perform.
-            
-            The available operations are:
-            1. list_tables - List all tables in PostgreSQL
-            2. list_collections - List all collections in MongoDB
-            3. view_table - View the contents of a PostgreSQL table
-            4. view_collection - View the contents of a MongoDB collection
-            5. count_records - Count records in a PostgreSQL table
-            6. count_documents - Count documents in a MongoDB collection
-            7. add_record - Add a record to a PostgreSQL table
-            8. add_document - Add a document to a MongoDB collection
-            9. delete_record - Delete records from a PostgreSQL table
-            10. delete_document - Delete documents from a MongoDB collection
-            11. create_table_from_csv - Create a PostgreSQL table from a CSV file
-            12. create_collection_from_csv - Create a MongoDB collection from a CSV file
-            13. create_table - Create a new PostgreSQL table with specified columns
-            14. create_collection - Create a new MongoDB collection
-            15. add_column - Add a column to a PostgreSQL table
-            16. add_multiple_columns - Add multiple columns to a PostgreSQL table
-            17. delete_column - Delete a column from a PostgreSQL table
-            18. update_row - Update values in a row in PostgreSQL
-            19. update_document - Update a document in MongoDB
-            20. rename_table - Rename a PostgreSQL table
-            21. rename_collection - Rename a MongoDB collection
-            22. rename_column - Rename a column in a PostgreSQL table
-            23. run_query - Run a custom SQL query for PostgreSQL
-            24. run_aggregation - Run an aggregation pipeline for MongoDB
-            
-            IMPORTANT:
-            - When the user mentions "table", determine if they're referring to PostgreSQL or MongoDB based on context. 
-              If unclear, assume PostgreSQL for "table" and MongoDB for "collection".
-            - For add/update operations, extract ALL fields provided by the user, even partial information.
-            - If user mentions multiple columns to add (like "add columns name, age, salary to table employees"), use add_multiple_columns operation.
-            - If the user's query has a format like "create column names X, Y, Z in table ABC", interpret this as add_multiple_columns.
-            - When users add columns through chat, ALWAYS infer appropriate data types for those columns based on their names.
-            - For join operations or complex queries, use the run_query operation with the appropriate SQL.
-            - For arithmetic and aggregation operations in MongoDB, use run_aggregation.
-            
-            DATA TYPE HANDLING:
-            - When adding columns, try to infer the appropriate data type from context.
-            - Common PostgreSQL data types: TEXT, VARCHAR, INTEGER, FLOAT, BOOLEAN, DATE, TIMESTAMP, JSONB
-            - If the user specifies a type explicitly (e.g., "add an age column as integer"), use that type.
-            - If the user doesn't specify, look for clues in the name or context:
-              * Columns like 'id', 'count', 'number', 'age', 'year', 'quantity' typically use INTEGER type
-              * Columns like 'price', 'amount', 'rate', 'cost', 'salary', 'fee' typically use FLOAT type
-              * Columns like 'is_active', 'has_paid', 'verified', 'active', 'enabled', 'status' typically use BOOLEAN type
-              * Columns like 'date', 'dob', 'birthday', 'birth_date', 'created_at', 'start_date' typically use DATE type
-              * Columns like 'timestamp', 'created_at', 'updated_at', 'last_login', 'modified_at' typically use TIMESTAMP type
-              * Columns like 'name', 'description', 'title', 'email', 'phone', 'address', 'occupation' typically use TEXT type
-              * Default to TEXT for column names that don't clearly match any of the above patterns
-            - For MongoDB collections, data types are handled automatically but object structure is preserved
-            
-            EXAMPLE QUERIES AND RESPONSES:
-            
-            Query: "Add columns name, age, email, and is_active to the users table"
-            Response:
-            {
-                "operation": "add_multiple_columns",
-                "target": "users",
-                "parameters": {
-                    "columns_data": {
-                        "name": "TEXT",
-                        "age": "INTEGER",
-                        "email": "TEXT",
-                        "is_active": "BOOLEAN"
-                    }
-                },
-                "explanation": "Adding multiple columns to the users table with appropriate data types"
-            }
-            
-            Query: "Create a new column DOB in customers table"
-            Response:
-            {
-                "operation": "add_column",
-                "target": "customers",
-                "parameters": {
-                    "column_name": "DOB",
-                    "column_type": "DATE"
-                },
-                "explanation": "Adding a DOB (date of birth) column with DATE type to the customers table"
-            }
-            
-            Given this user query: "{query}"
-            
-            Determine:
-            1. The operation to perform (one of the operations listed above)
-            2. The target (table name or collection name) if applicable
-            3. Any additional parameters needed for the operation
-            
-            Format your response as a JSON object with these fields:
-            {{
-                "operation": "operation_name",
-                "target": "target_name",
-                "parameters": {{ relevant parameters as key-value pairs }},
-                "explanation": "Brief explanation of the interpreted query"
-            }}
-            
-            When handling multiple columns, use a format like:
-            {{
-                "operation": "add_multiple_columns",
-                "target": "table_name",
-                "parameters": {{
-                    "columns_data": {{
-                        "name": "TEXT",
-                        "age": "INTEGER",
-                        "email": "TEXT",
-                        "is_active": "BOOLEAN"
-                    }}
-                }},
-                "explanation": "Adding multiple columns to the table with appropriate data types"
-            }}
-            
-            If the user query is unclear or doesn't match any of the available operations, respond with:
-            {{
-                "operation": "unknown",
-                "explanation": "I couldn't understand the database operation from your query. Could you please rephrase?"
-            }}
-            
-            Respond ONLY with the JSON, no other text.
-            """
-        )
+        # Define the instructions that help the LLM understand database queries.
+        # The prompt is fully static and sent byte-identical on every call so the
+        # provider can cache it as a prefix; only the user message varies.
+        self._static_prefix = textwrap.dedent("""\
+            You turn user requests into PostgreSQL or MongoDB operations.
+            Operations with their parameters:
+            PostgreSQL: list_tables; view_table{limit}; count_records; add_record{data}; delete_record{condition}; create_table{columns:{name:type}}; add_column{column_name,column_type}; add_multiple_columns{columns_data:{name:type}}; delete_column{column_name}; rename_column{old_name,new_name}; rename_table{new_name}; update_row{set_values,condition}; run_query{query,params}; create_table_from_csv
+            MongoDB: list_collections; view_collection{limit,projection}; count_documents{filter}; add_document{data}; delete_document{filter}; create_collection; rename_collection{new_name}; update_document{filter,update}; run_aggregation{pipeline}; create_collection_from_csv
+            Rules: "table" means PostgreSQL and "collection" MongoDB unless context says otherwise. Extract every field the user gives. Several new columns use add_multiple_columns. Joins and complex SQL use run_query; MongoDB arithmetic and grouping use run_aggregation. Set a column type only if the user states it, otherwise "".
+            Schema: {"operation":<op>,"target":<table or collection>,"parameters":<object>,"explanation":<short text>}
+            If the request is unclear: {"operation":"unknown","explanation":"I couldn't understand the database operation from your query. Could you please rephrase?"}
+            Respond with the JSON object only.""")
+        self._system_message = {"role": "system", "content": self._static_prefix}
         
-        self.chain = LLMChain(llm=self.llm, prompt=self.prompt_template)
+        # Memoize LLM responses so repeated queries skip the API round-trip
+        self._cached_response = lru_cache(maxsize=1024)(self._query_llm)
+        
+        self._fast_path_hits = 0
+        self._fast_path_misses = 0
     
     def parse_query(self, query):
         """Parse user query using the LLM agent"""
-        try:
-            # Get response from LLM
-            response = self.chain.run(query=query)
-            
-            # Clean the response to ensure it's valid JSON
-            # Sometimes LLM adds backticks or other formatting
-            response = re.sub(r'^```json', '', response)
-            response = re.sub(r'```$', '', response)
-            response = response.strip()
-            
-            # Parse JSON response
-            result = json.loads(response)
+        # Try the local patterns first so trivial queries skip the LLM entirely
+        result = self._match_fast_path(query)
+        if result is not None:
             return result
+        
+        try:
+            # Get response from LLM (or the cache if this query was seen before)
+            response = self._cached_response(LLM_MODEL, self._normalize_query(query))
+            return self._parse_response(response)
         except Exception as e:
             # Return error response if parsing fails
+            return self._error_result(e)
+    
+    def parse_queries(self, queries):
+        """Parse several user queries, sending the ones that need the LLM concurrently
+        
+        Queries matched by the local patterns are resolved without the LLM, and
+        the rest go through the same response cache as parse_query, with each
+        distinct query requested only once.
+        
+        Args:
+            queries (list): User queries to parse
+            
+        Returns:
+            list: Parsed results, in the same order as the queries
+        """
+        results = [self._match_fast_path(query) for query in queries]
+        pending = {self._normalize_query(query) for query, result in zip(queries, results) if result is None}
+        if not pending:
+            return results
+        
+        # Send the remaining requests concurrently so their latencies overlap;
+        # cached queries return immediately without an API call
+        with ThreadPoolExecutor(max_workers=min(len(pending), 8)) as executor:
+            futures = {query: executor.submit(self._cached_response, LLM_MODEL, query) for query in pending}
+        
+        for i, query in enumerate(queries):
+            if results[i] is not None:
+                continue
+            # Failures are returned per query instead of failing the whole batch
+            try:
+                results[i] = self._parse_response(futures[self._normalize_query(query)].result())
+            except Exception as e:
+                results[i] = self._error_result(e)
+        return results
+    
+    def _match_fast_path(self, query):
+        """Parse a query with the local patterns, or return None if none match"""
+        result = None
+        for pattern, build_result in self._FAST_PATTERNS:
+            match = pattern.match(query)
+            if match:
+                result = build_result(match)
+                break
+        
+        if result is None:
+            self._fast_path_misses += 1
+        else:
+            self._fast_path_hits += 1
+        total = self._fast_path_hits + self._fast_path_misses
+        logger.debug("Fast-path hit rate: %d/%d (%.0f%%)",
+                     self._fast_path_hits, total, 100 * self._fast_path_hits / total)
+        return result
+    
+    def clear_cache(self):
+        """Forget all memoized LLM responses"""
+        self._cached_response.cache_clear()
+    
+    def _normalize_query(self, query):
+        """Collapse whitespace so trivially different queries share a cache entry"""
+        # Case is preserved since table names and values can be case-sensitive
+        return " ".join(query.split())
+    
+    def _query_llm(self, model, query):
+        """Get the cleaned JSON response for a query from the LLM
+        
+        Args:
+            model (str): LLM model name, part of the cache key
+            query (str): Normalized user query
+            
+        Returns:
+            str: JSON text of the parsed query
+        """
+        response = self._complete(query)
+        # Validate before returning so malformed responses never get cached
+        orjson.loads(response)
+        return response
+    
+    def _complete(self, query):
+        """Send a query to the LLM and return the raw JSON text of its answer"""
+        # JSON mode guarantees a bare JSON object, with no code fences to strip
+        response = self.client.chat.completions.create(
+            model=LLM_MODEL,
+            temperature=0,
+            response_format={"type": "json_object"},
+            messages=[self._system_message, {"role": "user", "content": query}]
+        )
+        return response.choices[0].message.content
+    
+    def _parse_response(self, response):
+        """Convert the LLM's JSON text into the parsed query dictionary"""
+        return self._fill_column_types(self._validate_result(orjson.loads(response)))
+    
+    def _validate_result(self, result):
+        """Coerce a decoded response into the expected schema
+        
+        Args:
+            result: Decoded JSON returned by the LLM
+            
+        Returns:
+            dict: Result with a known operation, a string target, a parameters
+                  dict and an explanation; or an "unknown" result
+        """
+        operation = result.get("operation") if isinstance(result, dict) else None
+        if operation not in _OPERATIONS:
+            explanation = result.get("explanation") if operation == "unknown" else None
             return {
-                "operation": "error",
-                "explanation": f"Error parsing query: {str(e)}"
+                "operation": "unknown",
+                "explanation": explanation if isinstance(explanation, str) and explanation else _UNCLEAR_EXPLANATION
             }
+        
+        target = result.get("target")
+        parameters = result.get("parameters")
+        explanation = result.get("explanation")
+        return {
+            "operation": operation,
+            "target": target if isinstance(target, str) else "",
+            "parameters": parameters if isinstance(parameters, dict) else {},
+            "explanation": explanation if isinstance(explanation, str) else ""
+        }
+    
+    def _fill_column_types(self, result):
+        """Fill in column types the LLM left empty by inferring them from the names
+        
+        Uses the same name rules as DBManager, so the types shown match the ones
+        the database layer would pick.
+        """
+        operation = result.get("operation")
+        parameters = result.get("parameters")
+        if not isinstance(parameters, dict):
+            return result
+        
+        if operation == "add_column":
+            if not parameters.get("column_type") and parameters.get("column_name"):
+                parameters["column_type"] = infer_type_from_name(parameters["column_name"])
+        elif operation in ("create_table", "add_multiple_columns"):
+            columns = parameters.get("columns" if operation == "create_table" else "columns_data")
+            if isinstance(columns, dict):
+                for col_name, col_type in columns.items():
+                    if not col_type:
+                        columns[col_name] = infer_type_from_name(col_name)
+        return result
+    
+    def _error_result(self, error):
+        """Build the response returned when a query can't be parsed"""
+        return {
+            "operation": "error",
+            "explanation": f"Error parsing query: {str(error)}"
+        }
     
     def is_upload_query(self, query):
         """Determine if a query is about uploading a CSV file"""
-        upload_keywords = ["upload", "csv", "file", "import", "create from"]
-        return any(keyword in query.lower() for keyword in upload_keywords)
+        return self._UPLOAD_RE.search(query) is not None
     
     def format_response(self, result):
         """Format the database operation result into a human-readable message"""
@@ -179,8 +265,8 @@ class QueryAgent:
                     return f"Found {len(data)} items: {', '.join(str(item) for item in data)}"
                 elif isinstance(data, int):
                     return f"Count: {data}"
-                elif hasattr(data, 'to_html'):  # Check if it's a pandas DataFrame
-                    return data  # Return DataFrame directly to display in Streamlit
+                elif isinstance(data, (pd.DataFrame, pa.Table)):
+                    return data  # Return table directly to display in Streamlit
                 else:
                     return str(data)
             else:
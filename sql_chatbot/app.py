@@ -1,11 +1,11 @@
 # type: ignore
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
 import json
-import tempfile
-import os
 from db_utils import DBManager
 from agent import QueryAgent
+from config import POSTGRES_CONFIG, MONGO_CONFIG
 
 # Set page configuration
 st.set_page_config(
@@ -15,126 +15,120 @@ st.set_page_config(
     initial_sidebar_state="collapsed"  # Start with sidebar collapsed for more chat space
 )
 
-# Function to process database operations based on parsed query
-def process_operation(query_result):
-    """Process the database operation based on the parsed query result"""
-    operation = query_result["operation"]
-    target = query_result.get("target", "")
-    parameters = query_result.get("parameters", {})
-    
-    db_manager = st.session_state.db_manager
-    
+# Shared across all sessions and reruns so the LLM client, prompt and database
+# connections are only built once per server process
+@st.cache_resource
+def get_agent():
+    """Return the shared QueryAgent instance"""
+    return QueryAgent()
+
+@st.cache_resource
+def get_db():
+    """Return the shared DBManager instance"""
+    return DBManager()
+
+# Table and collection listings change rarely, so they are cached for a minute
+# and invalidated whenever an operation may have changed them
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_list_tables(_db):
+    """List PostgreSQL tables, cached across sessions"""
+    return _db.postgres_list_tables()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_list_collections(_db):
+    """List MongoDB collections, cached across sessions"""
+    return _db.mongo_list_collections()
+
+def _list_cached(cached_func, db):
+    """Return a cached listing, without keeping failed results (e.g. not connected)"""
+    result = cached_func(db)
+    if not result[0]:
+        cached_func.clear()
+    return result
+
+def clear_listing_cache():
+    """Invalidate the cached table and collection listings"""
+    _cached_list_tables.clear()
+    _cached_list_collections.clear()
+
+# Operations that can add, remove or rename tables or collections
+_LISTING_CHANGES = {
+    "create_table", "rename_table", "run_query",
+    "create_collection", "rename_collection", "add_document", "run_aggregation",
+}
+
+def _as_arrow(result):
+    """Convert a DataFrame result to an Arrow table, which Streamlit displays
+    without converting it again on every rerun"""
+    status, data = result
+    if status and isinstance(data, pd.DataFrame):
+        try:
+            return status, pa.Table.from_pandas(data, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # Columns with mixed types (common in MongoDB) stay as a DataFrame
+            pass
+    return result
+
+# Map each operation name to a call on the DBManager taking (db, target, parameters)
+_DISPATCH = {
     # PostgreSQL Operations
-    if operation == "list_tables":
-        return db_manager.postgres_list_tables()
-    
-    elif operation == "view_table":
-        limit = parameters.get("limit", 100)
-        return db_manager.postgres_view_table(target, limit)
-    
-    elif operation == "count_records":
-        return db_manager.postgres_count_records(target)
-    
-    elif operation == "add_record":
-        record_data = parameters.get("data", {})
-        return db_manager.postgres_add_record(target, record_data)
-    
-    elif operation == "delete_record":
-        condition = parameters.get("condition", "")
-        return db_manager.postgres_delete_record(target, condition)
-    
-    elif operation == "create_table_from_csv":
-        # This is handled by the UI file uploader
-        return False, "Please use the file uploader to create a table from CSV."
+    "list_tables": lambda db, t, p: _list_cached(_cached_list_tables, db),
+    "view_table": lambda db, t, p: _as_arrow(db.postgres_view_table_fast(t, p.get("limit", 100))),
+    "count_records": lambda db, t, p: db.postgres_count_records_fast(t),
+    "add_record": lambda db, t, p: db.postgres_add_record(t, p.get("data", {})),
+    "delete_record": lambda db, t, p: db.postgres_delete_record(t, p.get("condition", "")),
+    # This is handled by the UI file uploader
+    "create_table_from_csv": lambda db, t, p: (False, "Please use the file uploader to create a table from CSV."),
     
     # New PostgreSQL operations
-    elif operation == "create_table":
-        columns = parameters.get("columns", {})
-        return db_manager.postgres_create_table(target, columns)
-    
-    elif operation == "add_column":
-        column_name = parameters.get("column_name", "")
-        column_type = parameters.get("column_type", "TEXT")
-        return db_manager.postgres_add_column(target, column_name, column_type)
-    
-    elif operation == "delete_column":
-        column_name = parameters.get("column_name", "")
-        return db_manager.postgres_delete_column(target, column_name)
-    
-    elif operation == "rename_column":
-        old_name = parameters.get("old_name", "")
-        new_name = parameters.get("new_name", "")
-        return db_manager.postgres_rename_column(target, old_name, new_name)
-    
-    elif operation == "rename_table":
-        new_name = parameters.get("new_name", "")
-        return db_manager.postgres_rename_table(target, new_name)
-    
-    elif operation == "update_row":
-        set_values = parameters.get("set_values", {})
-        condition = parameters.get("condition", "")
-        return db_manager.postgres_update_row(target, set_values, condition)
-    
-    elif operation == "run_query":
-        query = parameters.get("query", "")
-        params = parameters.get("params", None)
-        return db_manager.postgres_run_query(query, params)
+    "create_table": lambda db, t, p: db.postgres_create_table(t, p.get("columns", {})),
+    "add_column": lambda db, t, p: db.postgres_add_column(
+        t, p.get("column_name", ""), p.get("column_type", "TEXT")),
+    "add_multiple_columns": lambda db, t, p: db.postgres_add_multiple_columns(t, p.get("columns_data", {})),
+    "delete_column": lambda db, t, p: db.postgres_delete_column(t, p.get("column_name", "")),
+    "rename_column": lambda db, t, p: db.postgres_rename_column(
+        t, p.get("old_name", ""), p.get("new_name", "")),
+    "rename_table": lambda db, t, p: db.postgres_rename_table(t, p.get("new_name", "")),
+    "update_row": lambda db, t, p: db.postgres_update_row(
+        t, p.get("set_values", {}), p.get("condition", "")),
+    "run_query": lambda db, t, p: db.postgres_run_query(p.get("query", ""), p.get("params", None)),
     
     # MongoDB Operations
-    elif operation == "list_collections":
-        return db_manager.mongo_list_collections()
-    
-    elif operation == "view_collection":
-        limit = parameters.get("limit", 100)
-        return db_manager.mongo_view_collection(target, limit)
-    
-    elif operation == "count_documents":
-        filter_query = parameters.get("filter", {})
-        return db_manager.mongo_count_documents(target, filter_query)
-    
-    elif operation == "add_document":
-        document_data = parameters.get("data", {})
-        return db_manager.mongo_add_document(target, document_data)
-    
-    elif operation == "delete_document":
-        filter_query = parameters.get("filter", {})
-        return db_manager.mongo_delete_document(target, filter_query)
-    
-    elif operation == "create_collection_from_csv":
-        # This is handled by the UI file uploader
-        return False, "Please use the file uploader to create a collection from CSV."
+    "list_collections": lambda db, t, p: _list_cached(_cached_list_collections, db),
+    "view_collection": lambda db, t, p: _as_arrow(db.mongo_view_collection(
+        t, p.get("limit", 100), p.get("projection"))),
+    "count_documents": lambda db, t, p: db.mongo_count_documents(t, p.get("filter", {})),
+    "add_document": lambda db, t, p: db.mongo_add_document(t, p.get("data", {})),
+    "delete_document": lambda db, t, p: db.mongo_delete_document(t, p.get("filter", {})),
+    # This is handled by the UI file uploader
+    "create_collection_from_csv": lambda db, t, p: (False, "Please use the file uploader to create a collection from CSV."),
     
     # New MongoDB operations
-    elif operation == "create_collection":
-        return db_manager.mongo_create_collection(target)
-    
-    elif operation == "rename_collection":
-        new_name = parameters.get("new_name", "")
-        return db_manager.mongo_rename_collection(target, new_name)
-    
-    elif operation == "update_document":
-        filter_query = parameters.get("filter", {})
-        update_data = parameters.get("update", {})
-        return db_manager.mongo_update_document(target, filter_query, update_data)
-    
-    elif operation == "run_aggregation":
-        pipeline = parameters.get("pipeline", [])
-        return db_manager.mongo_run_aggregation(target, pipeline)
-    
-    elif operation == "add_multiple_columns":
-        columns_data = parameters.get("columns_data", {})
-        return db_manager.postgres_add_multiple_columns(target, columns_data)
+    "create_collection": lambda db, t, p: db.mongo_create_collection(t),
+    "rename_collection": lambda db, t, p: db.mongo_rename_collection(t, p.get("new_name", "")),
+    "update_document": lambda db, t, p: db.mongo_update_document(
+        t, p.get("filter", {}), p.get("update", {})),
+    "run_aggregation": lambda db, t, p: db.mongo_run_aggregation(t, p.get("pipeline", [])),
+}
+
+# Function to process database operations based on parsed query
+def process_operation(query_result):
+    """Process the database operation based on the parsed query result"""
+    operation = query_result["operation"]
+    target = query_result.get("target", "")
+    parameters = query_result.get("parameters", {})
     
-    else:
+    handler = _DISPATCH.get(operation)
+    if handler is None:
         return False, f"Operation '{operation}' not implemented or recognized."
+    result = handler(get_db(), target, parameters)
+    if operation in _LISTING_CHANGES:
+        clear_listing_cache()
+    return result
 
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
-if "db_manager" not in st.session_state:
-    st.session_state.db_manager = DBManager()
-if "query_agent" not in st.session_state:
-    st.session_state.query_agent = QueryAgent()
 if "show_upload" not in st.session_state:
     st.session_state.show_upload = False  # Control upload section visibility
 
@@ -153,21 +147,79 @@ if len(st.session_state.messages) == 0:
         "content": "Hello! I'm your database assistant. How can I help you with your PostgreSQL or MongoDB databases today?"
     })
 
-# Display chat messages using Streamlit's native chat elements
-for message in st.session_state.messages:
+# Number of most recent chat messages rendered on every rerun
+_MAX_VISIBLE = 50
+
+def render_message(message):
+    """Display a single chat message using Streamlit's native chat elements"""
     if message["role"] == "user":
         with st.chat_message("user"):
             st.write(message["content"])
     else:
         with st.chat_message("assistant"):
-            if isinstance(message["content"], pd.DataFrame):
+            if isinstance(message["content"], (pd.DataFrame, pa.Table)):
                 st.write("Here's the data you requested:")
                 st.dataframe(message["content"], height=min(400, len(message["content"]) * 35 + 38))
             else:
                 st.write(message["content"])
 
-# Chat input
-user_input = st.chat_input("Ask me about your databases...")
+# Chat area as a fragment: new messages only rerun this part of the page
+# instead of the whole script (sidebar, upload section, etc.)
+@st.fragment
+def chat_area():
+    """Display the chat history and process new user input"""
+    # Only the latest messages are rendered by default; older ones (and their
+    # DataFrames) are only sent to the browser when the user asks for them
+    messages = st.session_state.messages
+    older = messages[:-_MAX_VISIBLE]
+    if older and st.toggle(f"Show {len(older)} earlier messages", key="show_earlier_messages"):
+        for message in older:
+            render_message(message)
+    
+    for message in messages[-_MAX_VISIBLE:]:
+        render_message(message)
+    
+    # Chat input
+    user_input = st.chat_input("Ask me about your databases...")
+    
+    # Process user input
+    if user_input:
+        # Add user message to chat history
+        st.session_state.messages.append({"role": "user", "content": user_input})
+        
+        # Process the query using the agent
+        with st.spinner("Thinking..."):
+            # Check if it's an upload-related query, which we handle via the UI
+            is_upload = get_agent().is_upload_query(user_input)
+            if is_upload:
+                response = "To upload a CSV file, please use the file uploader section. I've turned it on for you."
+                st.session_state.show_upload = True
+            else:
+                # Parse the query using the LLM agent
+                query_result = get_agent().parse_query(user_input)
+                
+                if query_result["operation"] == "unknown" or query_result["operation"] == "error":
+                    # Handle unknown or error operations
+                    response = query_result["explanation"]
+                else:
+                    # Process known operations
+                    try:
+                        db_result = process_operation(query_result)
+                        response = get_agent().format_response(db_result)
+                    except Exception as e:
+                        response = f"Error executing operation: {str(e)}"
+        
+        # Add assistant response to chat history
+        st.session_state.messages.append({"role": "assistant", "content": response})
+        
+        # Rerun to update the display; the whole page only when the upload
+        # section has to be shown, otherwise just this fragment
+        if is_upload:
+            st.rerun()
+        else:
+            st.rerun(scope="fragment")
+
+chat_area()
 
 # CSV upload section - only shown when toggle is active
 if st.session_state.show_upload:
@@ -178,9 +230,10 @@ if st.session_state.show_upload:
     if uploaded_file is not None:
         # Preview the CSV in a more compact way
         try:
-            df_preview = pd.read_csv(uploaded_file)
+            # Only the previewed rows are parsed, not the whole file
+            df_preview = pd.read_csv(uploaded_file, nrows=5)
             with st.expander("CSV Preview", expanded=True):
-                st.dataframe(df_preview.head(), height=200)
+                st.dataframe(df_preview, height=200)
             
             # Allow user to choose target database and provide a name
             cols = st.columns(2)
@@ -190,34 +243,57 @@ if st.session_state.show_upload:
                 target_name = st.text_input("Table/Collection name:")
             
             if st.button("Create from CSV") and target_name:
-                # Save uploaded file to a temporary file
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as tmp_file:
-                    tmp_file.write(uploaded_file.getvalue())
-                    temp_file_path = tmp_file.name
-                
+                # Stream the uploaded file directly; rewind it after the preview read
+                uploaded_file.seek(0)
                 try:
                     # Process based on selected database
                     if target_db == "PostgreSQL":
-                        status, message = st.session_state.db_manager.postgres_create_table_from_csv(
-                            target_name, temp_file_path
+                        status, message = get_db().postgres_create_table_from_csv(
+                            target_name, uploaded_file
                         )
                     else:  # MongoDB
-                        status, message = st.session_state.db_manager.mongo_create_collection_from_csv(
-                            target_name, temp_file_path
+                        status, message = get_db().mongo_create_collection_from_csv(
+                            target_name, uploaded_file
                         )
                     
+                    clear_listing_cache()
+                    
                     # Add system message with result
                     st.session_state.messages.append({"role": "assistant", "content": message})
                     st.rerun()
                 except Exception as e:
                     st.error(f"Error creating from CSV: {str(e)}")
-                finally:
-                    # Clean up temporary file
-                    if os.path.exists(temp_file_path):
-                        os.unlink(temp_file_path)
         except Exception as e:
             st.error(f"Error reading CSV file: {str(e)}")
 
+def _connect(kind, connector, config, cfg_update):
+    """Update a database configuration, connect, and report the result in the chat
+    
+    Args:
+        kind (str): Database name shown in messages
+        connector (callable): DBManager method opening the connection
+        config (dict): Configuration dictionary to update
+        cfg_update (dict): New connection details
+    """
+    try:
+        # Update connection details
+        config.update(cfg_update)
+        
+        # Try to connect; listings cached for the old database are stale
+        clear_listing_cache()
+        status, message = connector()
+    except Exception as e:
+        st.error(f"Error updating {kind} connection: {str(e)}")
+        return
+    
+    if status:
+        st.success(message)
+    else:
+        st.error(message)
+    # Add the result to the chat
+    st.session_state.messages.append({"role": "assistant", "content": f"{'✅' if status else '❌'} {message}"})
+    st.rerun()
+
 # Streamlined sidebar for database connection controls
 with st.sidebar:
     st.header("Database Connections")
@@ -234,30 +310,13 @@ with st.sidebar:
         pg_password = st.text_input("Password", "postgres", key="pg_password", type="password")
         
         if st.button("Connect to PostgreSQL", use_container_width=True):
-            # Update connection details
-            st.session_state.db_manager.pg_conn = None  # Close existing connection
-            try:
-                from config import POSTGRES_CONFIG
-                POSTGRES_CONFIG["host"] = pg_host
-                POSTGRES_CONFIG["port"] = pg_port
-                POSTGRES_CONFIG["database"] = pg_db
-                POSTGRES_CONFIG["user"] = pg_user
-                POSTGRES_CONFIG["password"] = pg_password
-                
-                # Try to connect
-                status, message = st.session_state.db_manager.connect_postgres()
-                if status:
-                    st.success(message)
-                    # Add a message to the chat
-                    st.session_state.messages.append({"role": "assistant", "content": f"✅ {message}"})
-                    st.rerun()
-                else:
-                    st.error(message)
-                    # Add an error message to the chat
-                    st.session_state.messages.append({"role": "assistant", "content": f"❌ {message}"})
-                    st.rerun()
-            except Exception as e:
-                st.error(f"Error updating PostgreSQL connection: {str(e)}")
+            _connect("PostgreSQL", get_db().connect_postgres, POSTGRES_CONFIG, {
+                "host": pg_host,
+                "port": pg_port,
+                "database": pg_db,
+                "user": pg_user,
+                "password": pg_password,
+            })
     
     # MongoDB connection section
     with st.expander("MongoDB Settings", expanded=True):
@@ -265,27 +324,10 @@ with st.sidebar:
         mongo_db = st.text_input("Database", "test", key="mongo_db")
         
         if st.button("Connect to MongoDB", use_container_width=True):
-            # Update connection details
-            st.session_state.db_manager.mongo_client = None  # Close existing connection
-            try:
-                from config import MONGO_CONFIG
-                MONGO_CONFIG["connection_string"] = mongo_uri
-                MONGO_CONFIG["database"] = mongo_db
-                
-                # Try to connect
-                status, message = st.session_state.db_manager.connect_mongo()
-                if status:
-                    st.success(message)
-                    # Add a message to the chat
-                    st.session_state.messages.append({"role": "assistant", "content": f"✅ {message}"})
-                    st.rerun()
-                else:
-                    st.error(message)
-                    # Add an error message to the chat
-                    st.session_state.messages.append({"role": "assistant", "content": f"❌ {message}"})
-                    st.rerun()
-            except Exception as e:
-                st.error(f"Error updating MongoDB connection: {str(e)}")
+            _connect("MongoDB", get_db().connect_mongo, MONGO_CONFIG, {
+                "connection_string": mongo_uri,
+                "database": mongo_db,
+            })
     
     # Clear chat history button
     st.markdown("---")
@@ -323,38 +365,6 @@ with st.sidebar:
         - "Run SQL: SELECT * FROM orders JOIN customers ON orders.customer_id = customers.id"
         """)
 
-# Process user input
-if user_input:
-    # Add user message to chat history
-    st.session_state.messages.append({"role": "user", "content": user_input})
-    
-    # Process the query using the agent
-    with st.spinner("Thinking..."):
-        # Check if it's an upload-related query, which we handle via the UI
-        if st.session_state.query_agent.is_upload_query(user_input):
-            response = "To upload a CSV file, please use the file uploader section. I've turned it on for you."
-            st.session_state.show_upload = True
-        else:
-            # Parse the query using the LLM agent
-            query_result = st.session_state.query_agent.parse_query(user_input)
-            
-            if query_result["operation"] == "unknown" or query_result["operation"] == "error":
-                # Handle unknown or error operations
-                response = query_result["explanation"]
-            else:
-                # Process known operations
-                try:
-                    db_result = process_operation(query_result)
-                    response = st.session_state.query_agent.format_response(db_result)
-                except Exception as e:
-                    response = f"Error executing operation: {str(e)}"
-    
-    # Add assistant response to chat history
-    st.session_state.messages.append({"role": "assistant", "content": response})
-    
-    # Rerun to update the display
-    st.rerun()
-
 if __name__ == "__main__":
     # This will be executed when the app is run
     pass 
\ No newline at end of file
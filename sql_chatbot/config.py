@@ -18,6 +18,10 @@ POSTGRES_CONFIG = {
 MONGO_CONFIG = {
     "connection_string": os.getenv("MONGO_URI", "mongodb://localhost:27017/"),
     "database": os.getenv("MONGO_DB", "test"),
+    "max_pool_size": os.getenv("MONGO_MAX_POOL_SIZE", "50"),
+    "min_pool_size": os.getenv("MONGO_MIN_POOL_SIZE", "5"),
+    # Wire compression, e.g. "zstd,snappy,zlib" (zstd and snappy need extra packages)
+    "compressors": os.getenv("MONGO_COMPRESSORS", ""),
 }
 
 # LLM API Configuration (OpenAI by default)
@@ -1,244 +1,800 @@
 # type: ignore
 import psycopg2
+from psycopg2 import sql
+from psycopg2.errors import FeatureNotSupported, InvalidSqlStatementName
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import execute_batch, execute_values
 import pandas as pd
-from pymongo import MongoClient
+import pyarrow as pa
 from config import POSTGRES_CONFIG, MONGO_CONFIG
-import io
 import os
-import json
-from bson import json_util
+import re
+import orjson
+import datetime
+import threading
+import time
+import hashlib
+import itertools
+from contextlib import contextmanager
+from functools import lru_cache
+
+# Rows sampled from a CSV to infer column types before streaming it into COPY
+_CSV_SAMPLE_ROWS = 5000
+# Rows read and inserted per batch when loading a CSV into MongoDB
+_CSV_CHUNK_ROWS = 10000
+# PostgreSQL types for pandas dtype kinds that need no value inspection
+_KIND_TO_PG = {'f': "FLOAT", 'b': "BOOLEAN", 'M': "TIMESTAMP", 'm': "INTERVAL"}
+# Strings read as booleans when converting CSV columns
+_TRUE_VALUES = frozenset({'true', 'yes', 't', 'y', '1'})
+_FALSE_VALUES = frozenset({'false', 'no', 'f', 'n', '0'})
+_BOOL_VALUES = _TRUE_VALUES | _FALSE_VALUES
+_BOOL_MAP = {**{v: True for v in _TRUE_VALUES}, **{v: False for v in _FALSE_VALUES}}
+# Upper bound on pooled PostgreSQL connections, unless POSTGRES_CONFIG sets "maxconn"
+_PG_MAX_CONN = 10
+# Seconds a pooled PostgreSQL connection is reused before it is closed and replaced
+_PG_MAX_LIFETIME = 1800
+# Rows sent per INSERT statement when adding records in bulk
+_PG_INSERT_PAGE_ROWS = 1000
+# UPDATE statements sent per round trip when updating rows in bulk
+_PG_UPDATE_PAGE_ROWS = 1000
+# Rows fetched per round trip from server-side cursors
+_PG_FETCH_ROWS = 10000
+# Executions on one connection after which a repeated query is prepared server-side
+_PG_PREPARE_THRESHOLD = 5
+# Distinct queries counted per connection before the counts are reset
+_PG_MAX_COUNTED = 1024
+# Errors from prepared statements that a fresh PREPARE can fix ("cached plan
+# must not change result type", or a statement deallocated behind our back)
+_PG_STALE_PLAN_ERRORS = (FeatureNotSupported, InvalidSqlStatementName)
+
+# PostgreSQL types accepted as-is when creating tables and columns
+_VALID_PG_TYPES = frozenset({
+    "TEXT", "VARCHAR", "CHAR", "INTEGER", "INT", "BIGINT", "SMALLINT", 
+    "FLOAT", "REAL", "DOUBLE PRECISION", "NUMERIC", "DECIMAL",
+    "BOOLEAN", "DATE", "TIMESTAMP", "TIME", "JSON", "JSONB"
+})
+
+# Column names that are always INTEGER identifiers
+_ID_NAMES = frozenset({'id', 'code', 'num', 'number', 'count'})
+# Name prefixes that mark a BOOLEAN flag, as in is_active or hasAccess
+_FLAG_PREFIXES = frozenset({'is', 'has', 'can'})
+# Separators between words in a column name, including camelCase boundaries
+_NAME_SEPARATORS = re.compile(r'[\s_\-]+|(?<=[a-z0-9])(?=[A-Z])')
+
+# Name words used to infer column types; groups earlier in the list win when
+# a word appears in more than one
+_NAME_TYPE_RULES = [
+    # INTEGER types - number-related columns
+    (frozenset({
+        'age', 'year', 'month', 'day', 'quantity', 'qty', 'count', 'num', 
+        'number', 'size', 'order', 'points', 'score', 'visits', 'views', 'clicks'
+    }), "INTEGER"),
+    # FLOAT types - numeric with decimal values
+    (frozenset({
+        'price', 'cost', 'fee', 'amount', 'sum', 'total', 'balance', 'rate', 
+        'percentage', 'percent', 'discount', 'salary', 'wage', 'height', 'weight', 
+        'latitude', 'longitude', 'rating', 'avg', 'average'
+    }), "FLOAT"),
+    # BOOLEAN types - flags and statuses
+    (frozenset({
+        'allow', 'active', 'enabled', 'flag', 'status', 
+        'verified', 'approved', 'accepted', 'valid', 'complete', 'done', 'confirmed',
+        'remember', 'subscribe', 'notify', 'public', 'visible', 'published'
+    }), "BOOLEAN"),
+    # TEXT types for common text fields
+    (frozenset({
+        'name', 'title', 'description', 'comment', 'message', 'text', 'content', 
+        'info', 'details', 'summary', 'address', 'email', 'phone', 'password',
+        'hash', 'token', 'key', 'code', 'url', 'link', 'path', 'username', 
+        'occupation', 'company', 'organization', 'department', 'notes', 'remarks'
+    }), "TEXT"),
+    # DATE types - date-related fields
+    (frozenset({
+        'date', 'dob', 'doj', 'birthday', 'birth', 'joined', 'expiry'
+    }), "DATE"),
+    # TIMESTAMP types - datetime fields
+    (frozenset({
+        'timestamp', 'datetime', 'at', 'login', 'logout', 'seen', 'time',
+        'created', 'updated', 'modified', 'deleted', 'update'
+    }), "TIMESTAMP"),
+    # JSON/JSONB types - complex data structures
+    (frozenset({
+        'json', 'metadata', 'meta', 'properties', 'attributes', 'config', 'configuration',
+        'settings', 'options', 'preferences', 'data', 'params', 'parameters'
+    }), "JSONB"),
+]
+# The same rules as a single word -> type lookup
+_NAME_TYPES = {word: pg_type for words, pg_type in reversed(_NAME_TYPE_RULES) for word in words}
+
+@lru_cache(maxsize=4096)
+def infer_type_from_name(column_name):
+    """Infer the most likely data type based on the column name
+    
+    The name is split into words (on underscores, spaces, hyphens and camelCase)
+    and only whole words are matched, so "message" is not read as "age". The
+    last word decides first, since it usually names what the column holds:
+    order_date is a DATE, not an INTEGER.
+    
+    Args:
+        column_name (str): Name of the column
+    
+    Returns:
+        str: Likely PostgreSQL data type for the column
+    """
+    words = _NAME_SEPARATORS.sub(' ', column_name).lower().split()
+    if not words:
+        return "TEXT"
+    
+    # Flags such as is_active or hasAccess
+    if words[0] in _FLAG_PREFIXES and len(words) > 1:
+        return "BOOLEAN"
+    
+    # Common ID patterns that should be INTEGER
+    if words[-1] == 'id' or '_'.join(words) in _ID_NAMES:
+        return "INTEGER"
+    
+    # Closest known word to the end of the name decides the type
+    for word in reversed(words):
+        pg_type = _NAME_TYPES.get(word)
+        if pg_type is not None:
+            return pg_type
+    
+    # Default to TEXT for anything we can't confidently categorize
+    return "TEXT"
+
+# Common date formats: ISO (YYYY-MM-DD), US (MM/DD/YYYY), European
+# (DD.MM.YYYY), YYYY.MM.DD and DD-MM-YYYY
+_DATE_ANY = re.compile(
+    r'^(?:\d{4}-\d{2}-\d{2}'
+    r'|\d{1,2}/\d{1,2}/\d{4}'
+    r'|\d{1,2}\.\d{1,2}\.\d{4}'
+    r'|\d{4}\.\d{2}\.\d{2}'
+    r'|\d{2}-\d{2}-\d{4})$',
+    re.ASCII
+)
+# Timestamp prefixes in the same formats
+_TIMESTAMP = re.compile(
+    r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}|'  # ISO format
+    r'^\d{2}/\d{2}/\d{4}\s\d{2}:\d{2}|'          # US format with time
+    r'^\d{2}\.\d{2}\.\d{4}\s\d{2}:\d{2}',        # EU format with time
+    re.ASCII
+)
+# Floats in sample values; patterns are ASCII-only, since PostgreSQL only parses
+# ASCII digits and Unicode-aware classes are slower to match
+_FLOAT_RE = re.compile(r'^[-+]?\d*\.?\d+([eE][-+]?\d+)?$', re.ASCII)
+# PostgreSQL types for sample values, looked up by exact type so bool is not read as int
+_VALUE_TYPES = {
+    int: "INTEGER",
+    float: "FLOAT",
+    bool: "BOOLEAN",
+    dict: "JSONB",
+    list: "JSONB",
+    datetime.datetime: "TIMESTAMP",
+    datetime.date: "DATE"
+}
+
+def _table_identifier(table_name):
+    """Quote a possibly schema-qualified table name for safe use in SQL
+    
+    Names are lower-cased first, matching how PostgreSQL folds the unquoted
+    names used when tables are created.
+    """
+    return sql.Identifier(*table_name.lower().split('.'))
+
+def _row_limit(limit, default=100):
+    """Coerce a requested row limit to a positive int, falling back to the default
+    
+    Limits come from the LLM, so a missing, null or non-numeric value must not
+    become LIMIT NULL and load the whole table.
+    """
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return default
+    return limit if limit > 0 else default
+
+# MongoClient instances shared by all DBManagers, keyed by connection string
+_MONGO_CLIENTS = {}
+_MONGO_LOCK = threading.Lock()
+
+def _get_mongo_client(connection_string):
+    """Return the shared MongoClient for a connection string, creating it on first use
+    
+    MongoClient pools its own connections, so reusing one client keeps warm
+    sockets instead of handshaking again for every DBManager or reconnect.
+    """
+    with _MONGO_LOCK:
+        client = _MONGO_CLIENTS.get(connection_string)
+        if client is None:
+            # Imported here so PostgreSQL-only use never loads the MongoDB driver
+            from pymongo import MongoClient
+            client = MongoClient(
+                connection_string,
+                maxPoolSize=int(MONGO_CONFIG.get("max_pool_size", 50)),
+                minPoolSize=int(MONGO_CONFIG.get("min_pool_size", 5)),
+                serverSelectionTimeoutMS=5000,
+                compressors=MONGO_CONFIG.get("compressors") or None
+            )
+            _MONGO_CLIENTS[connection_string] = client
+        return client
+
+def _release_mongo_client(client):
+    """Close a shared MongoClient and forget it"""
+    with _MONGO_LOCK:
+        for connection_string, shared in list(_MONGO_CLIENTS.items()):
+            if shared is client:
+                del _MONGO_CLIENTS[connection_string]
+        client.close()
+
+def _as_update(update_data):
+    """Wrap plain field values in $set unless they already use MongoDB operators"""
+    if next((True for key in update_data if key[:1] == '$'), False):
+        return update_data
+    return {'$set': update_data}
+
+def _stringify_object_ids(value, object_id_type):
+    """Replace ObjectIds in a value, and in any documents or arrays it contains, with strings"""
+    if isinstance(value, object_id_type):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: _stringify_object_ids(item, object_id_type) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_stringify_object_ids(item, object_id_type) for item in value]
+    return value
+
+# Arrow-backed string dtype, stored as one buffer instead of Python objects
+_ARROW_STRING = pd.ArrowDtype(pa.string())
+
+def _load_json(value):
+    """Parse a JSON string, or return None for missing or malformed values"""
+    if not isinstance(value, str):
+        return None
+    try:
+        return orjson.loads(value)
+    except orjson.JSONDecodeError:
+        return None
+
+def _downcast(df):
+    """Shrink a result DataFrame to the smallest dtypes that hold its values
+    
+    Integers move to the narrowest (unsigned when possible) type and repetitive
+    string columns become categoricals. Floats are left alone, since float32
+    would change the values shown.
+    
+    Args:
+        df (DataFrame): Result to shrink in place
+        
+    Returns:
+        DataFrame: The same DataFrame
+    """
+    for col in df.select_dtypes('integer').columns:
+        downcast = 'unsigned' if (df[col] >= 0).all() else 'integer'
+        df[col] = pd.to_numeric(df[col], downcast=downcast)
+    for col in df.select_dtypes('object').columns:
+        # Only plain strings; JSON values are dicts and lists, which can't be categories
+        if pd.api.types.infer_dtype(df[col], skipna=True) != 'string':
+            continue
+        if df[col].nunique() / max(len(df), 1) < 0.5:
+            df[col] = df[col].astype('category')
+    return df
+
+@lru_cache(maxsize=256)
+def _alter_table_query(template, table_name, *names):
+    """Compose an ALTER TABLE statement with quoted identifiers
+    
+    Composed statements are memoized, so repeating an operation on the same
+    table and names reuses the same object.
+    
+    Args:
+        template (str): SQL with a {} placeholder for the table, then one per name
+        table_name (str): Table to alter, folded like an unquoted name
+        names (str): Column (or new table) names, quoted exactly as given
+    """
+    return sql.SQL(template).format(_table_identifier(table_name), *map(sql.Identifier, names))
+
+# Leading whitespace and comments, then the first keyword of a query
+_FIRST_KEYWORD_RE = re.compile(r'(?:\s|--[^\n]*(?:\n|$)|/\*.*?\*/)*(\w+)', re.DOTALL)
+# Statements that can be declared as a server-side cursor
+_CURSOR_KEYWORDS = frozenset({'select', 'values', 'table'})
+
+@lru_cache(maxsize=1024)
+def _is_select(query):
+    """Check whether a query is a plain SELECT (or VALUES / TABLE) statement
+    
+    Leading whitespace and -- or /* */ comments are skipped; only the first
+    keyword is inspected.
+    """
+    match = _FIRST_KEYWORD_RE.match(query)
+    return bool(match) and match.group(1).lower() in _CURSOR_KEYWORDS
+
+class _PgConnection(psycopg2.extensions.connection):
+    """PostgreSQL connection that remembers its server-side prepared statements"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Maps SQL text to the name of its prepared statement
+        self.prepared = {}
+        # Schema version the prepared statements were created against
+        self.prepared_version = 0
+        # Counts plain executions of queries that may be prepared once they repeat
+        self.executions = {}
+        # Used to recycle the connection once it outlives the pool's max lifetime
+        self.opened_at = time.monotonic()
 
 class DBManager:
     def __init__(self):
-        self.pg_conn = None
+        # Created on first use, so connection settings can still be changed from the UI
+        self.pg_pool = None
+        # Bumped whenever tables may have been renamed or replaced
+        self._pg_schema_version = 0
         self.mongo_client = None
         self.mongo_db = None
+        # Collection handles by name, reused instead of rebuilt on every call
+        self._mongo_collections = {}
+        # Guards connection state, since one instance is shared across sessions
+        self._lock = threading.Lock()
     
     # PostgreSQL Connection Methods
     def connect_postgres(self):
         """Connect to PostgreSQL database"""
-        try:
-            self.pg_conn = psycopg2.connect(
-                host=POSTGRES_CONFIG["host"],
-                port=POSTGRES_CONFIG["port"],
-                database=POSTGRES_CONFIG["database"],
-                user=POSTGRES_CONFIG["user"],
-                password=POSTGRES_CONFIG["password"]
-            )
-            return True, "Connected to PostgreSQL"
-        except Exception as e:
-            return False, f"PostgreSQL connection error: {str(e)}"
+        with self._lock:
+            try:
+                pool = ThreadedConnectionPool(
+                    minconn=1,
+                    maxconn=int(POSTGRES_CONFIG.get("maxconn", _PG_MAX_CONN)),
+                    host=POSTGRES_CONFIG["host"],
+                    port=POSTGRES_CONFIG["port"],
+                    database=POSTGRES_CONFIG["database"],
+                    user=POSTGRES_CONFIG["user"],
+                    password=POSTGRES_CONFIG["password"],
+                    connection_factory=_PgConnection
+                )
+                # Replace any pool opened with the previous settings
+                if self.pg_pool is not None:
+                    self.pg_pool.closeall()
+                self.pg_pool = pool
+                return True, "Connected to PostgreSQL"
+            except Exception as e:
+                return False, f"PostgreSQL connection error: {str(e)}"
     
     def close_postgres(self):
         """Close PostgreSQL connection"""
-        if self.pg_conn:
-            self.pg_conn.close()
-            self.pg_conn = None
-            return True, "PostgreSQL connection closed"
-        return False, "No active PostgreSQL connection"
+        with self._lock:
+            if self.pg_pool is not None:
+                self.pg_pool.closeall()
+                self.pg_pool = None
+                return True, "PostgreSQL connection closed"
+            return False, "No active PostgreSQL connection"
+    
+    @contextmanager
+    def _pg(self):
+        """Borrow a pooled PostgreSQL connection for one unit of work
+        
+        The transaction is committed when the block exits normally and rolled
+        back on error, then the connection is returned to the pool. Broken
+        connections and ones older than the max lifetime are closed instead,
+        so the pool opens a fresh socket on the next checkout.
+        """
+        pool = self.pg_pool
+        conn = pool.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            # The pool may have been replaced by a reconnect in the meantime
+            if not pool.closed:
+                max_lifetime = float(POSTGRES_CONFIG.get("max_lifetime", _PG_MAX_LIFETIME))
+                stale = conn.closed or time.monotonic() - conn.opened_at > max_lifetime
+                pool.putconn(conn, close=stale)
     
     # MongoDB Connection Methods
     def connect_mongo(self):
         """Connect to MongoDB database"""
-        try:
-            self.mongo_client = MongoClient(MONGO_CONFIG["connection_string"])
-            self.mongo_db = self.mongo_client[MONGO_CONFIG["database"]]
-            return True, "Connected to MongoDB"
-        except Exception as e:
-            return False, f"MongoDB connection error: {str(e)}"
+        with self._lock:
+            try:
+                self.mongo_client = _get_mongo_client(MONGO_CONFIG["connection_string"])
+                self.mongo_db = self.mongo_client[MONGO_CONFIG["database"]]
+                self._mongo_collections = {}
+                return True, "Connected to MongoDB"
+            except Exception as e:
+                return False, f"MongoDB connection error: {str(e)}"
     
     def close_mongo(self):
         """Close MongoDB connection"""
-        if self.mongo_client is not None:
-            self.mongo_client.close()
-            self.mongo_client = None
-            self.mongo_db = None
-            return True, "MongoDB connection closed"
-        return False, "No active MongoDB connection"
+        with self._lock:
+            if self.mongo_client is not None:
+                _release_mongo_client(self.mongo_client)
+                self.mongo_client = None
+                self.mongo_db = None
+                self._mongo_collections = {}
+                return True, "MongoDB connection closed"
+            return False, "No active MongoDB connection"
+    
+    def _coll(self, collection_name):
+        """Return the cached handle for a collection in the current database"""
+        collection = self._mongo_collections.get(collection_name)
+        if collection is None:
+            collection = self._mongo_collections[collection_name] = self.mongo_db[collection_name]
+        return collection
     
     # PostgreSQL Operations
     def postgres_list_tables(self):
         """List all tables in PostgreSQL database"""
-        if not self.pg_conn:
+        if self.pg_pool is None:
             status, message = self.connect_postgres()
             if not status:
                 return False, message
         
         try:
-            cursor = self.pg_conn.cursor()
-            cursor.execute("""
-                SELECT table_name 
-                FROM information_schema.tables 
-                WHERE table_schema = 'public'
-            """)
-            tables = [table[0] for table in cursor.fetchall()]
-            cursor.close()
-            return True, tables
+            with self._pg() as conn, conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT table_name 
+                    FROM information_schema.tables 
+                    WHERE table_schema = 'public'
+                """)
+                tables = [table[0] for table in cursor.fetchall()]
+                return True, tables
         except Exception as e:
             return False, f"Error listing PostgreSQL tables: {str(e)}"
     
     def postgres_view_table(self, table_name, limit=100):
         """View contents of a specific PostgreSQL table"""
-        if not self.pg_conn:
+        limit = _row_limit(limit)
+        if self.pg_pool is None:
             status, message = self.connect_postgres()
             if not status:
                 return False, message
         
         try:
-            query = f"SELECT * FROM {table_name} LIMIT {limit}"
-            df = pd.read_sql_query(query, self.pg_conn)
-            return True, df
+            query = sql.SQL("SELECT * FROM {} LIMIT %s").format(_table_identifier(table_name))
+            with self._pg() as conn:
+                df = self._read_frame(conn, query, (limit,))
+            return True, _downcast(df)
         except Exception as e:
             return False, f"Error viewing PostgreSQL table: {str(e)}"
     
     def postgres_count_records(self, table_name):
         """Count records in a PostgreSQL table"""
-        if not self.pg_conn:
+        if self.pg_pool is None:
             status, message = self.connect_postgres()
             if not status:
                 return False, message
         
         try:
-            cursor = self.pg_conn.cursor()
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            count = cursor.fetchone()[0]
-            cursor.close()
-            return True, count
+            with self._pg() as conn, conn.cursor() as cursor:
+                cursor.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(_table_identifier(table_name)))
+                count = cursor.fetchone()[0]
+                return True, count
+        except Exception as e:
+            return False, f"Error counting records in PostgreSQL table: {str(e)}"
+    
+    def postgres_view_table_fast(self, table_name, limit=100):
+        """View contents of a PostgreSQL table through a cached prepared statement"""
+        limit = _row_limit(limit)
+        if self.pg_pool is None:
+            status, message = self.connect_postgres()
+            if not status:
+                return False, message
+        
+        try:
+            with self._pg() as conn, conn.cursor() as cursor:
+                query = sql.SQL("SELECT * FROM {} LIMIT $1").format(_table_identifier(table_name))
+                self._execute_prepared(cursor, query, (limit,))
+                columns = [desc[0] for desc in cursor.description]
+                df = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+                return True, _downcast(df)
+        except Exception as e:
+            return False, f"Error viewing PostgreSQL table: {str(e)}"
+    
+    def postgres_count_records_fast(self, table_name):
+        """Count records in a PostgreSQL table through a cached prepared statement"""
+        if self.pg_pool is None:
+            status, message = self.connect_postgres()
+            if not status:
+                return False, message
+        
+        try:
+            with self._pg() as conn, conn.cursor() as cursor:
+                query = sql.SQL("SELECT COUNT(*) FROM {}").format(_table_identifier(table_name))
+                self._execute_prepared(cursor, query)
+                count = cursor.fetchone()[0]
+                return True, count
         except Exception as e:
             return False, f"Error counting records in PostgreSQL table: {str(e)}"
     
+    def _read_frame(self, conn, query, params=None):
+        """Run a SELECT on a server-side cursor and build a DataFrame from it
+        
+        Rows arrive from the server in batches of _PG_FETCH_ROWS instead of
+        being buffered in full on the client first.
+        
+        Args:
+            conn: Pooled connection, inside a transaction
+            query (str or Composable): SELECT query
+            params (list, optional): Parameters for the query
+        """
+        with conn.cursor(name="read_frame") as cursor:
+            cursor.itersize = _PG_FETCH_ROWS
+            cursor.execute(query, params)
+            # Column names are only known once the first batch is fetched
+            rows = cursor.fetchmany(_PG_FETCH_ROWS)
+            columns = [desc[0] for desc in cursor.description]
+            # Build the frame straight from the fetched tuples
+            return pd.DataFrame.from_records(itertools.chain(rows, cursor), columns=columns)
+    
+    def _execute_prepared(self, cursor, query, params=()):
+        """Execute a query through a server-side prepared statement
+        
+        Each distinct query is prepared once per pooled connection, so repeat
+        calls skip parsing and planning. A call that fails because a plan was
+        invalidated by a schema change, or a statement has gone missing, resets
+        the connection's statements and is retried once; any other error is
+        raised straight away.
+        
+        Args:
+            cursor: Cursor on a pooled connection
+            query (str or Composable): SQL query using $1, $2, ... placeholders
+            params (tuple, optional): Values for the placeholders
+        """
+        conn = cursor.connection
+        if not isinstance(query, str):
+            query = query.as_string(cursor)
+        if conn.prepared_version != self._pg_schema_version:
+            self._reset_prepared(cursor)
+        
+        for attempt in range(2):
+            try:
+                name = conn.prepared.get(query)
+                if name is None:
+                    name = "p_" + hashlib.sha1(query.encode()).hexdigest()[:16]
+                    cursor.execute(f"PREPARE {name} AS {query}")
+                    conn.prepared[query] = name
+                if params:
+                    placeholders = ", ".join(["%s"] * len(params))
+                    cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+                else:
+                    cursor.execute(f"EXECUTE {name}")
+                return
+            except _PG_STALE_PLAN_ERRORS:
+                conn.rollback()
+                self._reset_prepared(cursor)
+                if attempt:
+                    raise
+    
+    def _execute_auto_prepared(self, cursor, query, prepared_query, params):
+        """Execute a query, switching to a prepared statement once it repeats
+        
+        The first runs of a query on a connection go through a plain execute;
+        from the _PG_PREPARE_THRESHOLD-th run on it is prepared server-side and
+        reused, so one-off queries never pay for an extra PREPARE round trip.
+        
+        Args:
+            cursor: Cursor on a pooled connection
+            query (str): SQL query using %s placeholders
+            prepared_query (str): The same query using $1, $2, ... placeholders
+            params (list): Values for the placeholders
+        """
+        conn = cursor.connection
+        if prepared_query not in conn.prepared:
+            if len(conn.executions) >= _PG_MAX_COUNTED:
+                conn.executions = {}
+            count = conn.executions.get(prepared_query, 0) + 1
+            conn.executions[prepared_query] = count
+            if count < _PG_PREPARE_THRESHOLD:
+                cursor.execute(query, params)
+                return
+        self._execute_prepared(cursor, prepared_query, tuple(params))
+    
+    def _reset_prepared(self, cursor):
+        """Drop all prepared statements on the cursor's connection"""
+        conn = cursor.connection
+        cursor.execute("DEALLOCATE ALL")
+        conn.prepared = {}
+        conn.prepared_version = self._pg_schema_version
+    
+    def _invalidate_prepared(self):
+        """Make every pooled connection drop its prepared statements before reuse"""
+        with self._lock:
+            self._pg_schema_version += 1
+    
     def postgres_add_record(self, table_name, record_data):
         """Add a record to a PostgreSQL table"""
-        if not self.pg_conn:
+        status, message = self.postgres_add_records(table_name, [record_data])
+        if status:
+            return True, "Record added successfully"
+        return status, message
+    
+    def postgres_add_records(self, table_name, records):
+        """Add several records to a PostgreSQL table in one statement
+        
+        Args:
+            table_name (str): Name of the table
+            records (list): Dictionaries mapping column names to values, all
+                            with the same keys
+        """
+        if self.pg_pool is None:
             status, message = self.connect_postgres()
             if not status:
                 return False, message
         
         try:
-            cursor = self.pg_conn.cursor()
-            columns = ", ".join(record_data.keys())
-            placeholders = ", ".join(["%s"] * len(record_data))
-            values = list(record_data.values())
-            
-            query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
-            cursor.execute(query, values)
-            self.pg_conn.commit()
-            cursor.close()
-            return True, "Record added successfully"
+            if not records:
+                return True, "0 records added"
+            
+            keys = list(records[0].keys())
+            if any(record.keys() != records[0].keys() for record in records):
+                return False, "Error adding records to PostgreSQL table: all records must have the same columns"
+            
+            with self._pg() as conn, conn.cursor() as cursor:
+                query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+                    _table_identifier(table_name),
+                    sql.SQL(", ").join(map(sql.Identifier, keys))
+                )
+                values = [tuple(record[key] for key in keys) for record in records]
+                execute_values(cursor, query, values, page_size=_PG_INSERT_PAGE_ROWS)
+                return True, f"{len(records)} records added"
         except Exception as e:
-            return False, f"Error adding record to PostgreSQL table: {str(e)}"
+            return False, f"Error adding records to PostgreSQL table: {str(e)}"
     
     def postgres_delete_record(self, table_name, condition):
         """Delete records from a PostgreSQL table based on a condition"""
-        if not self.pg_conn:
+        if self.pg_pool is None:
             status, message = self.connect_postgres()
             if not status:
                 return False, message
         
         try:
-            cursor = self.pg_conn.cursor()
-            query = f"DELETE FROM {table_name} WHERE {condition}"
-            cursor.execute(query)
-            deleted_count = cursor.rowcount
-            self.pg_conn.commit()
-            cursor.close()
-            return True, f"{deleted_count} records deleted"
+            with self._pg() as conn, conn.cursor() as cursor:
+                query = f"DELETE FROM {table_name} WHERE {condition}"
+                cursor.execute(query)
+                deleted_count = cursor.rowcount
+                return True, f"{deleted_count} records deleted"
         except Exception as e:
             return False, f"Error deleting records from PostgreSQL table: {str(e)}"
     
-    def postgres_create_table_from_csv(self, table_name, csv_file):
-        """Create a new PostgreSQL table from a CSV file"""
-        if not self.pg_conn:
+    def postgres_create_table_from_csv(self, table_name, csv_file, unlogged=False):
+        """Create a new PostgreSQL table from a CSV file
+        
+        Column types are inferred from a sample of the file, then the raw CSV
+        is streamed into COPY as-is, without loading it into a DataFrame. Only
+        empty fields become NULL; markers such as "NA" or "null" are stored as
+        text, and make the column TEXT if they appear in the sample. The
+        whole load runs in one transaction with synchronous_commit off, so the
+        commit does not wait for the WAL flush; a server crash right after the
+        load can lose it, but never leaves a partial table.
+        
+        Args:
+            table_name (str): Name of the table to create
+            csv_file (file or str): Seekable file object with the CSV data
+                                    (including header), or a path to the file
+            unlogged (bool): Create an UNLOGGED table, which skips WAL entirely
+                             but is emptied after a crash; for staging data only
+        """
+        if isinstance(csv_file, str):
+            with open(csv_file, 'rb') as file:
+                return self.postgres_create_table_from_csv(table_name, file, unlogged)
+        
+        if self.pg_pool is None:
             status, message = self.connect_postgres()
             if not status:
                 return False, message
         
         try:
-            # Read the CSV file
-            df = pd.read_csv(csv_file)
-            
-            # Generate CREATE TABLE statement with improved type detection
-            columns = []
-            for col in df.columns:
-                # Use pandas dtype for initial inference
-                dtype = df[col].dtype
-                
-                # Check for all integer values
-                if pd.api.types.is_integer_dtype(dtype):
-                    # Check if it might be a boolean (only 0s and 1s)
-                    unique_vals = set(df[col].dropna().unique())
-                    if unique_vals.issubset({0, 1}) and len(unique_vals) <= 2:
-                        col_type = "BOOLEAN"
-                    else:
-                        col_type = "INTEGER"
-                
-                # Check for float values
-                elif pd.api.types.is_float_dtype(dtype):
-                    col_type = "FLOAT"
-                
-                # Check for datetime
-                elif pd.api.types.is_datetime64_dtype(dtype):
-                    col_type = "TIMESTAMP"
-                
-                # For string/object columns, do more detailed inspection
-                else:
-                    # Default to TEXT
-                    col_type = "TEXT"
-                    
-                    # Skip empty columns
-                    if df[col].isna().all():
-                        col_type = "TEXT"
-                        columns.append(f'"{col}" {col_type}')
-                        continue
-                    
-                    # Check sample of non-null values (up to 100)
-                    sample = df[col].dropna().head(100)
-                    
-                    # Only continue if we have data
-                    if len(sample) > 0:
-                        # Check if all values might be dates
-                        try:
-                            pd.to_datetime(sample)
-                            col_type = "DATE"
-                        except:
-                            # Check if values might be booleans
-                            if all(str(v).lower() in ('true', 'false', 'yes', 'no', 't', 'f', 'y', 'n', '1', '0') 
-                                   for v in sample):
-                                col_type = "BOOLEAN"
-                            # Check if values might be JSON
-                            elif all((str(v).startswith('{') and str(v).endswith('}')) or 
-                                    (str(v).startswith('[') and str(v).endswith(']'))
-                                    for v in sample):
-                                try:
-                                    # Try to parse first value as JSON
-                                    json.loads(str(sample.iloc[0]))
-                                    col_type = "JSONB"
-                                except:
-                                    pass
-                
-                columns.append(f'"{col}" {col_type}')
+            # Infer the column types from the first rows only. COPY reads only
+            # empty fields as NULL, so tokens like "NA" or "null" are kept as
+            # text here too, and the inferred types accept every raw value
+            sample = pd.read_csv(csv_file, nrows=_CSV_SAMPLE_ROWS,
+                                 keep_default_na=False, na_values=[""])
+            columns = self._infer_csv_columns(sample)
+            csv_file.seek(0)
             
             # Create table
-            cursor = self.pg_conn.cursor()
-            create_query = f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(columns)})"
-            cursor.execute(create_query)
+            with self._pg() as conn, conn.cursor() as cursor:
+                cursor.execute("SET LOCAL synchronous_commit = OFF")
+                table_kind = "UNLOGGED TABLE" if unlogged else "TABLE"
+                create_query = f"CREATE {table_kind} IF NOT EXISTS {table_name} ({', '.join(columns)})"
+                cursor.execute(create_query)
+                
+                # Stream the file straight into the table
+                cursor.copy_expert(f"COPY {table_name} FROM STDIN WITH CSV HEADER", csv_file)
+                record_count = cursor.rowcount
+                
+                return True, f"Created table '{table_name}' with {record_count} records"
+        except Exception as e:
+            return False, f"Error creating PostgreSQL table from CSV: {str(e)}"
+    
+    def _infer_csv_columns(self, df):
+        """Infer PostgreSQL column definitions for a DataFrame read from a CSV
+        
+        Args:
+            df (DataFrame): CSV data (or a sample of it)
             
-            # Insert data
-            buffer = io.StringIO()
-            df.to_csv(buffer, index=False, header=False)
-            buffer.seek(0)
+        Returns:
+            list: Column definitions for a CREATE TABLE statement
+        """
+        return [f'"{col}" {pg_type}' for col, pg_type in self.infer_column_types(df).items()]
+    
+    def infer_column_types(self, df):
+        """Infer PostgreSQL types for every column of a DataFrame
+        
+        Each column is checked with whole-column pandas operations on a sample
+        of its values, rather than value by value through _infer_column_type.
+        
+        Args:
+            df (DataFrame or list): Data to inspect, or a list of dictionaries
             
-            cursor.copy_expert(f"COPY {table_name} FROM STDIN WITH CSV", buffer)
-            self.pg_conn.commit()
-            cursor.close()
+        Returns:
+            dict: Mapping of column names to PostgreSQL data types
+        """
+        if not isinstance(df, pd.DataFrame):
+            df = pd.DataFrame(df)
+        return {col: self._infer_pg_type(df[col]) for col in df.columns}
+    
+    def _infer_pg_type(self, series):
+        """Infer the PostgreSQL type of a column with whole-column checks
+        
+        Args:
+            series (Series): Column data (or a sample of it)
             
-            return True, f"Created table '{table_name}' with {len(df)} records"
-        except Exception as e:
-            return False, f"Error creating PostgreSQL table from CSV: {str(e)}"
+        Returns:
+            str: PostgreSQL data type for the column
+        """
+        # Use the pandas dtype kind for initial inference
+        kind = series.dtype.kind
+        
+        # Check for all integer values
+        if kind in 'iu':
+            # Check if it might be a boolean (only 0s and 1s)
+            return "BOOLEAN" if series.isin((0, 1)).all() else "INTEGER"
+        
+        # Float, boolean, datetime and timedelta columns map directly
+        if kind in _KIND_TO_PG:
+            return _KIND_TO_PG[kind]
+        
+        # For string/object columns, check a sample of non-null values (up to 100)
+        sample = series.dropna().head(100)
+        
+        # Skip empty columns
+        if len(sample) == 0:
+            return "TEXT"
+        
+        # Dictionaries and lists (e.g. from a list of records) are JSON already
+        if sample.map(type).isin((dict, list)).all():
+            return "JSONB"
+        
+        values = sample.astype('string')
+        # Check if values might be booleans
+        if values.str.lower().isin(_BOOL_VALUES).all():
+            return "BOOLEAN"
+        
+        # Check if all values are numbers stored as text
+        numeric = pd.to_numeric(sample, errors='coerce')
+        if numeric.notna().all():
+            return "INTEGER" if pd.api.types.is_integer_dtype(numeric) else "FLOAT"
+        
+        # Check if all values might be dates
+        if pd.to_datetime(sample, errors='coerce').notna().all():
+            return "DATE"
+        
+        # Check if values might be JSON
+        if ((values.str.startswith('{') & values.str.endswith('}')) |
+                (values.str.startswith('[') & values.str.endswith(']'))).all():
+            try:
+                # Try to parse first value as JSON
+                orjson.loads(values.iloc[0])
+                return "JSONB"
+            except orjson.JSONDecodeError:
+                pass
+        
+        # Default to TEXT
+        return "TEXT"
     
     def postgres_create_table_from_csv_path(self, table_name, csv_file_path):
         """Create a new PostgreSQL table from a CSV file at the given path"""
-        if not self.pg_conn:
+        if self.pg_pool is None:
             status, message = self.connect_postgres()
             if not status:
                 return False, message
@@ -247,11 +803,9 @@ class DBManager:
             # Check if file exists
             if not os.path.exists(csv_file_path):
                 return False, f"CSV file not found at path: {csv_file_path}"
-                
-            # Read the CSV file
-            df = pd.read_csv(csv_file_path)
             
-            # For consistency, use the file-based implementation
+            # For consistency, use the file-based implementation, which
+            # only reads a sample of the file before streaming it
             with open(csv_file_path, 'rb') as file:
                 return self.postgres_create_table_from_csv(table_name, file)
                 
@@ -272,27 +826,33 @@ class DBManager:
         except Exception as e:
             return False, f"Error listing MongoDB collections: {str(e)}"
     
-    def mongo_view_collection(self, collection_name, limit=100):
-        """View contents of a specific MongoDB collection"""
+    def mongo_view_collection(self, collection_name, limit=100, projection=None):
+        """View contents of a specific MongoDB collection
+        
+        Args:
+            collection_name (str): Name of the collection
+            limit (int): Maximum number of documents to return
+            projection (dict or list, optional): Fields to return, so unwanted
+                                                 fields are dropped server-side
+        """
+        limit = _row_limit(limit)
         if self.mongo_db is None:
             status, message = self.connect_mongo()
             if not status:
                 return False, message
         
         try:
-            collection = self.mongo_db[collection_name]
-            documents = list(collection.find({}).limit(limit))
-            
-            # Convert MongoDB documents to pandas DataFrame
-            if documents:
-                df = pd.DataFrame(documents)
-                # Convert ObjectId to string for better display
-                if '_id' in df.columns:
-                    df['_id'] = df['_id'].astype(str)
-            else:
-                df = pd.DataFrame()
+            collection = self._coll(collection_name)
+            # Fetch the whole preview in as few round trips as possible
+            cursor = collection.find({}, projection=projection).batch_size(min(limit, 1000)).limit(limit)
+            
+            # Convert MongoDB documents to pandas DataFrame as they arrive
+            df = pd.DataFrame.from_records(cursor, nrows=limit)
+            # Convert ObjectId to string for better display
+            if '_id' in df.columns:
+                df['_id'] = df['_id'].astype(str).astype(_ARROW_STRING)
                 
-            return True, df
+            return True, _downcast(df)
         except Exception as e:
             return False, f"Error viewing MongoDB collection: {str(e)}"
     
@@ -304,7 +864,7 @@ class DBManager:
                 return False, message
         
         try:
-            collection = self.mongo_db[collection_name]
+            collection = self._coll(collection_name)
             if filter_query is None:
                 filter_query = {}
             count = collection.count_documents(filter_query)
@@ -320,7 +880,7 @@ class DBManager:
                 return False, message
         
         try:
-            collection = self.mongo_db[collection_name]
+            collection = self._coll(collection_name)
             result = collection.insert_one(document_data)
             return True, f"Document added with ID: {result.inserted_id}"
         except Exception as e:
@@ -334,34 +894,52 @@ class DBManager:
                 return False, message
         
         try:
-            collection = self.mongo_db[collection_name]
+            collection = self._coll(collection_name)
             result = collection.delete_many(filter_query)
             return True, f"{result.deleted_count} documents deleted"
         except Exception as e:
             return False, f"Error deleting documents from MongoDB collection: {str(e)}"
     
-    def mongo_create_collection_from_csv(self, collection_name, csv_file):
-        """Create a new MongoDB collection from a CSV file"""
+    def mongo_create_collection_from_csv(self, collection_name, csv_file, chunk_rows=None,
+                                         bypass_document_validation=False):
+        """Create a new MongoDB collection from a CSV file
+        
+        Args:
+            collection_name (str): Name of the collection to create
+            csv_file (file): File object with the CSV data (including header)
+            chunk_rows (int, optional): Rows read and inserted per batch
+            bypass_document_validation (bool): Skip the collection's schema validator
+                                               while inserting, for trusted data
+        """
         if self.mongo_db is None:
             status, message = self.connect_mongo()
             if not status:
                 return False, message
         
         try:
-            # Read the CSV file with improved type detection
-            df = pd.read_csv(csv_file)
-            
-            # Process data types before conversion to dictionaries
-            df = self._process_dataframe_types(df)
-            
-            # Convert DataFrame to list of dictionaries (documents)
-            documents = df.to_dict('records')
+            # Create collection and insert documents in batches, so only one
+            # chunk of the CSV is held in memory at a time
+            collection = self._coll(collection_name)
+            inserted_count = 0
+            conversions = None
+            for chunk in pd.read_csv(csv_file, chunksize=chunk_rows or _CSV_CHUNK_ROWS):
+                # Process data types before conversion to dictionaries, deciding
+                # the types from the first chunk so every document agrees
+                if conversions is None:
+                    conversions = self._dataframe_conversions(chunk)
+                chunk = self._process_dataframe_types(chunk, conversions)
+                
+                # Convert DataFrame to list of dictionaries (documents)
+                documents = chunk.to_dict('records')
+                if documents:
+                    result = collection.insert_many(
+                        documents, ordered=False,
+                        bypass_document_validation=bypass_document_validation
+                    )
+                    inserted_count += len(result.inserted_ids)
             
-            # Create collection and insert documents
-            collection = self.mongo_db[collection_name]
-            if documents:
-                result = collection.insert_many(documents)
-                return True, f"Created collection '{collection_name}' with {len(result.inserted_ids)} documents"
+            if inserted_count:
+                return True, f"Created collection '{collection_name}' with {inserted_count} documents"
             else:
                 return True, f"Created empty collection '{collection_name}'"
         except Exception as e:
@@ -386,64 +964,101 @@ class DBManager:
         except Exception as e:
             return False, f"Error creating MongoDB collection from CSV: {str(e)}"
     
-    def _process_dataframe_types(self, df):
-        """Process DataFrame to convert columns to appropriate types
+    def _dataframe_conversions(self, df):
+        """Decide how each string column of a DataFrame should be converted
         
         Args:
-            df (DataFrame): Input DataFrame
+            df (DataFrame): Data to inspect, e.g. the first chunk of a CSV
             
         Returns:
-            DataFrame: Processed DataFrame with appropriate types
+            dict: Mapping of column names to 'datetime', 'boolean', 'numeric' or 'json'
         """
+        conversions = {}
         for col in df.columns:
+            kind = df[col].dtype.kind
+            # Columns pandas already parsed keep that type in later chunks too
+            if kind in 'iuf':
+                conversions[col] = 'numeric'
+                continue
+            if kind == 'b':
+                conversions[col] = 'boolean'
+                continue
+            # Otherwise only string columns need converting
+            if df[col].dtype != 'object':
+                continue
+            
+            non_null = df[col].notna()
+            non_null_count = non_null.sum()
             # If column is all NaN, skip it
-            if df[col].isna().all():
+            if non_null_count == 0:
                 continue
-                
-            # Get a sample of non-null values
-            sample = df[col].dropna().head(100)
-            if len(sample) == 0:
+            
+            # Try datetime conversion; accept it only if every value parsed
+            converted = pd.to_datetime(df[col], errors='coerce')
+            if converted.notna().sum() == non_null_count:
+                conversions[col] = 'datetime'
                 continue
-                
-            # Try to convert strings to appropriate types
-            if df[col].dtype == 'object':
-                # Try datetime conversion
+            
+            values = df[col].astype('string')
+            
+            # Check if values might be boolean
+            if values[non_null].str.lower().isin(_BOOL_VALUES).all():
+                conversions[col] = 'boolean'
+                continue
+            
+            # Check if values might be numeric
+            numeric = pd.to_numeric(df[col], errors='coerce')
+            if numeric.notna().sum() == non_null_count:
+                conversions[col] = 'numeric'
+                continue
+            
+            # Check if values might be JSON
+            present = values[non_null]
+            is_object = present.str.startswith('{') & present.str.endswith('}')
+            is_array = present.str.startswith('[') & present.str.endswith(']')
+            if (is_object | is_array).all():
+                # Try to parse as JSON
                 try:
-                    df[col] = pd.to_datetime(df[col])
-                    continue
-                except:
+                    present.map(orjson.loads)
+                    conversions[col] = 'json'
+                except orjson.JSONDecodeError:
                     pass
-                    
-                # Check if values might be boolean
-                if all(str(v).lower() in ('true', 'false', 'yes', 'no', 't', 'f', 'y', 'n', '1', '0') 
-                       for v in sample):
-                    # Convert to boolean
-                    df[col] = df[col].map(lambda x: str(x).lower() in ('true', 'yes', 't', 'y', '1') 
-                                         if pd.notnull(x) else None)
-                    continue
-                    
-                # Check if values might be numeric
-                try:
-                    # Try integer conversion
-                    df[col] = pd.to_numeric(df[col], downcast='integer')
-                    continue
-                except:
-                    try:
-                        # Try float conversion
-                        df[col] = pd.to_numeric(df[col], downcast='float')
-                        continue
-                    except:
-                        pass
-                        
-                # Check if values might be JSON
-                if all((str(v).startswith('{') and str(v).endswith('}')) or 
-                       (str(v).startswith('[') and str(v).endswith(']'))
-                       for v in sample):
-                    # Try to parse as JSON
-                    try:
-                        df[col] = df[col].apply(lambda x: json.loads(str(x)) if pd.notnull(x) else None)
-                    except:
-                        pass
+        
+        return conversions
+    
+    def _process_dataframe_types(self, df, conversions=None):
+        """Process DataFrame to convert columns to appropriate types
+        
+        Values that do not fit the chosen type (e.g. a stray word in a numeric
+        column of a later chunk) become missing, so a column keeps one type.
+        
+        Args:
+            df (DataFrame): Input DataFrame
+            conversions (dict, optional): Result of _dataframe_conversions, so
+                                          every chunk of a file is converted the
+                                          same way; detected from df if omitted
+            
+        Returns:
+            DataFrame: Processed DataFrame with appropriate types
+        """
+        if conversions is None:
+            conversions = self._dataframe_conversions(df)
+        
+        for col, kind in conversions.items():
+            if col not in df.columns:
+                continue
+            
+            if kind == 'datetime':
+                df[col] = pd.to_datetime(df[col], errors='coerce')
+            elif kind == 'numeric':
+                df[col] = pd.to_numeric(df[col], errors='coerce', downcast='integer')
+            elif kind == 'boolean' and df[col].dtype != bool:
+                # Convert to boolean with a dict lookup, keeping missing values as
+                # None so they can still be stored as documents
+                converted = df[col].astype('string').str.lower().map(_BOOL_MAP)
+                df[col] = converted.astype(object).where(converted.notna(), None)
+            elif kind == 'json':
+                df[col] = df[col].map(_load_json)
         
         return df
     
@@ -456,37 +1071,28 @@ class DBManager:
             columns (dict): Dictionary mapping column names to their data types
                            (or empty strings for automatic type inference)
         """
-        if not self.pg_conn:
+        if self.pg_pool is None:
             status, message = self.connect_postgres()
             if not status:
                 return False, message
         
         try:
-            cursor = self.pg_conn.cursor()
-            
-            # Format column definitions
-            column_defs = []
-            valid_types = [
-                "TEXT", "VARCHAR", "CHAR", "INTEGER", "INT", "BIGINT", "SMALLINT", 
-                "FLOAT", "REAL", "DOUBLE PRECISION", "NUMERIC", "DECIMAL",
-                "BOOLEAN", "DATE", "TIMESTAMP", "TIME", "JSON", "JSONB"
-            ]
-            
-            for col_name, col_type in columns.items():
-                # Check if a valid type was provided, otherwise infer it
-                if not col_type or col_type.upper() not in valid_types:
-                    inferred_type = self._infer_type_from_name(col_name)
-                    column_defs.append(f'"{col_name}" {inferred_type}')
-                else:
-                    column_defs.append(f'"{col_name}" {col_type}')
-            
-            # Create the table
-            create_query = f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(column_defs)})"
-            cursor.execute(create_query)
-            self.pg_conn.commit()
-            cursor.close()
-            
-            return True, f"Table '{table_name}' created successfully"
+            with self._pg() as conn, conn.cursor() as cursor:
+                # Format column definitions
+                column_defs = []
+                for col_name, col_type in columns.items():
+                    # Check if a valid type was provided, otherwise infer it
+                    if not col_type or col_type.upper() not in _VALID_PG_TYPES:
+                        inferred_type = self._infer_type_from_name(col_name)
+                        column_defs.append(f'"{col_name}" {inferred_type}')
+                    else:
+                        column_defs.append(f'"{col_name}" {col_type}')
+                
+                # Create the table
+                create_query = f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(column_defs)})"
+                cursor.execute(create_query)
+                
+                return True, f"Table '{table_name}' created successfully"
         except Exception as e:
             return False, f"Error creating PostgreSQL table: {str(e)}"
     
@@ -498,109 +1104,28 @@ class DBManager:
             column_name (str): Name of the column to add
             column_type (str): SQL data type of the column or will be inferred if not a valid type
         """
-        if not self.pg_conn:
+        if self.pg_pool is None:
             status, message = self.connect_postgres()
             if not status:
                 return False, message
         
         try:
-            cursor = self.pg_conn.cursor()
-            
-            # Check if a valid PostgreSQL type was provided
-            valid_types = [
-                "TEXT", "VARCHAR", "CHAR", "INTEGER", "INT", "BIGINT", "SMALLINT", 
-                "FLOAT", "REAL", "DOUBLE PRECISION", "NUMERIC", "DECIMAL",
-                "BOOLEAN", "DATE", "TIMESTAMP", "TIME", "JSON", "JSONB"
-            ]
-            
-            # If not a known type, attempt to infer the type from the column name
-            if column_type.upper() not in valid_types:
-                inferred_type = self._infer_type_from_name(column_name)
-                query = f'ALTER TABLE {table_name} ADD COLUMN "{column_name}" {inferred_type}'
-            else:
-                query = f'ALTER TABLE {table_name} ADD COLUMN "{column_name}" {column_type}'
+            with self._pg() as conn, conn.cursor() as cursor:
+                # If not a known PostgreSQL type, attempt to infer the type from the column name
+                if column_type.upper() not in _VALID_PG_TYPES:
+                    inferred_type = self._infer_type_from_name(column_name)
+                    query = f'ALTER TABLE {table_name} ADD COLUMN "{column_name}" {inferred_type}'
+                else:
+                    query = f'ALTER TABLE {table_name} ADD COLUMN "{column_name}" {column_type}'
+                    
+                cursor.execute(query)
                 
-            cursor.execute(query)
-            self.pg_conn.commit()
-            cursor.close()
-            
-            return True, f"Column '{column_name}' added to table '{table_name}'"
+                return True, f"Column '{column_name}' added to table '{table_name}'"
         except Exception as e:
             return False, f"Error adding column to PostgreSQL table: {str(e)}"
     
-    def _infer_type_from_name(self, column_name):
-        """Infer the most likely data type based on the column name
-        
-        Args:
-            column_name (str): Name of the column
-            
-        Returns:
-            str: Likely PostgreSQL data type for the column
-        """
-        name_lower = column_name.lower().strip()
-        
-        # Common ID patterns that should be INTEGER
-        id_patterns = ['id', '_id', 'code', 'num', 'number', 'count']
-        if name_lower == 'id' or name_lower.endswith('_id') or name_lower.endswith('id') or any(p == name_lower for p in id_patterns):
-            return "INTEGER"
-            
-        # INTEGER types - number-related columns
-        if any(pattern in name_lower for pattern in [
-            'age', 'year', 'month', 'day', 'quantity', 'qty', 'count', 'num', 
-            'number', 'size', 'order', 'points', 'score', 'visits', 'views', 'clicks'
-        ]):
-            return "INTEGER"
-            
-        # FLOAT types - numeric with decimal values
-        if any(pattern in name_lower for pattern in [
-            'price', 'cost', 'fee', 'amount', 'sum', 'total', 'balance', 'rate', 
-            'percentage', 'percent', 'discount', 'salary', 'wage', 'height', 'weight', 
-            'latitude', 'longitude', 'rating', 'avg', 'average'
-        ]):
-            return "FLOAT"
-            
-        # BOOLEAN types - flags and statuses
-        if any(pattern in name_lower for pattern in [
-            'is_', 'has_', 'can_', 'allow', 'active', 'enabled', 'flag', 'status', 
-            'verified', 'approved', 'accepted', 'valid', 'complete', 'done', 'confirmed',
-            'remember', 'subscribe', 'notify', 'public', 'visible', 'published'
-        ]):
-            return "BOOLEAN"
-        
-        # TEXT types for common text fields
-        if any(pattern in name_lower for pattern in [
-            'name', 'title', 'description', 'comment', 'message', 'text', 'content', 
-            'info', 'details', 'summary', 'address', 'email', 'phone', 'password',
-            'hash', 'token', 'key', 'code', 'url', 'link', 'path', 'username', 
-            'first_name', 'last_name', 'middle_name', 'job_title', 'occupation',
-            'company', 'organization', 'department', 'notes', 'remarks'
-        ]):
-            return "TEXT"
-            
-        # DATE types - date-related fields
-        if any(pattern in name_lower for pattern in [
-            'date', 'dob', 'doj', 'birthday', 'birth', 'joined', 'start_date', 'end_date',
-            'hire_date', 'termination_date', 'registration_date', 'expiration_date', 'expiry'
-        ]):
-            return "DATE"
-            
-        # TIMESTAMP types - datetime fields
-        if any(pattern in name_lower for pattern in [
-            'timestamp', 'datetime', 'created_at', 'updated_at', 'modified_at', 'deleted_at',
-            'login_time', 'logout_time', 'last_seen', 'last_login', 'last_modified', 
-            'time', 'created', 'updated', 'modified', 'last_update'
-        ]):
-            return "TIMESTAMP"
-            
-        # JSON/JSONB types - complex data structures
-        if any(pattern in name_lower for pattern in [
-            'json', 'metadata', 'meta', 'properties', 'attributes', 'config', 'configuration',
-            'settings', 'options', 'preferences', 'data', 'params', 'parameters'
-        ]):
-            return "JSONB"
-            
-        # Default to TEXT for anything we can't confidently categorize
-        return "TEXT"
+    # Module-level so QueryAgent fills in column types with the same rules
+    _infer_type_from_name = staticmethod(infer_type_from_name)
     
     def postgres_add_multiple_columns(self, table_name, columns_data):
         """Add multiple columns to an existing PostgreSQL table at once
@@ -610,38 +1135,31 @@ class DBManager:
             columns_data (dict): Dictionary mapping column names to their data types
                                 (or values to infer types from)
         """
-        if not self.pg_conn:
+        if self.pg_pool is None:
             status, message = self.connect_postgres()
             if not status:
                 return False, message
         
         try:
-            cursor = self.pg_conn.cursor()
-            
-            # Format column definitions with type inference
-            column_defs = []
-            for col_name, col_type_or_value in columns_data.items():
-                # If data type is specified directly, use it
-                if isinstance(col_type_or_value, str) and col_type_or_value.upper() in [
-                    "TEXT", "VARCHAR", "INTEGER", "INT", "BIGINT", "SMALLINT", 
-                    "FLOAT", "REAL", "DOUBLE PRECISION", "NUMERIC", "DECIMAL",
-                    "BOOLEAN", "DATE", "TIMESTAMP", "TIME", "JSON", "JSONB"
-                ]:
-                    col_type = col_type_or_value
-                # Otherwise, infer type from the value or use TEXT as default
-                else:
-                    col_type = self._infer_column_type(col_type_or_value)
+            with self._pg() as conn, conn.cursor() as cursor:
+                # Format column definitions with type inference
+                column_defs = []
+                for col_name, col_type_or_value in columns_data.items():
+                    # If data type is specified directly, use it
+                    if isinstance(col_type_or_value, str) and col_type_or_value.upper() in _VALID_PG_TYPES:
+                        col_type = col_type_or_value
+                    # Otherwise, infer type from the value or use TEXT as default
+                    else:
+                        col_type = self._infer_column_type(col_type_or_value)
+                    
+                    column_defs.append(f'ADD COLUMN "{col_name}" {col_type}')
                 
-                column_defs.append(f'ADD COLUMN "{col_name}" {col_type}')
-            
-            # Create the ALTER TABLE statement with multiple ADD COLUMN clauses
-            alter_query = f'ALTER TABLE {table_name} {", ".join(column_defs)}'
-            cursor.execute(alter_query)
-            self.pg_conn.commit()
-            cursor.close()
-            
-            column_names = list(columns_data.keys())
-            return True, f"Added columns {', '.join(column_names)} to table '{table_name}'"
+                # Create the ALTER TABLE statement with multiple ADD COLUMN clauses
+                alter_query = f'ALTER TABLE {table_name} {", ".join(column_defs)}'
+                cursor.execute(alter_query)
+                
+                column_names = list(columns_data.keys())
+                return True, f"Added columns {', '.join(column_names)} to table '{table_name}'"
         except Exception as e:
             return False, f"Error adding columns to PostgreSQL table: {str(e)}"
     
@@ -672,77 +1190,50 @@ class DBManager:
                 return "BOOLEAN"
                 
             # Check for common date formats
-            import re
-            # ISO date format (YYYY-MM-DD)
-            iso_date_pattern = re.compile(r'^\d{4}-\d{2}-\d{2}$')
-            # US date format (MM/DD/YYYY)
-            us_date_pattern = re.compile(r'^\d{1,2}/\d{1,2}/\d{4}$')
-            # European date format (DD/MM/YYYY)
-            eu_date_pattern = re.compile(r'^\d{1,2}\.\d{1,2}\.\d{4}$')
-            # Other common formats
-            other_date_pattern = re.compile(r'^\d{4}\.\d{2}\.\d{2}$|^\d{2}-\d{2}-\d{4}$')
-            
-            if (iso_date_pattern.match(value) or us_date_pattern.match(value) or 
-                eu_date_pattern.match(value) or other_date_pattern.match(value)):
+            if _DATE_ANY.match(value):
                 return "DATE"
                 
             # Check for timestamp formats
-            timestamp_pattern = re.compile(
-                r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}|'  # ISO format
-                r'^\d{2}/\d{2}/\d{4}\s\d{2}:\d{2}|'          # US format with time
-                r'^\d{2}\.\d{2}\.\d{4}\s\d{2}:\d{2}'         # EU format with time
-            )
-            if timestamp_pattern.match(value):
+            if _TIMESTAMP.match(value):
                 return "TIMESTAMP"
                 
             # Check if it can be converted to a number
-            # Integer check
-            if re.match(r'^[-+]?\d+$', value):
+            # Integer check: plain digits after an optional sign, no regex needed
+            digits = value[1:] if value[:1] in ('+', '-') else value
+            if digits.isascii() and digits.isdecimal():
                 return "INTEGER"
-            # Float check (handles scientific notation too)
-            if re.match(r'^[-+]?\d*\.?\d+([eE][-+]?\d+)?$', value):
-                    return "FLOAT"
+            # Float check (handles scientific notation too); without a point or
+            # exponent the pattern could only match the integers handled above
+            if ('.' in value or 'e' in value or 'E' in value) and _FLOAT_RE.match(value):
+                return "FLOAT"
                     
             # Check for JSON-like structure
             if (value.startswith('{') and value.endswith('}')) or (value.startswith('[') and value.endswith(']')):
                 try:
-                    json.loads(value)
+                    orjson.loads(value)
                     return "JSONB"
-                except:
+                except orjson.JSONDecodeError:
                     pass
             
-            # Check if it looks like a URL
-            url_pattern = re.compile(r'^(http|https|ftp)://[^\s/$.?#].[^\s]*$')
-            if url_pattern.match(value):
-                return "TEXT"
-                
-            # Check if it looks like an email
-            email_pattern = re.compile(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$')
-            if email_pattern.match(value):
-                return "TEXT"
-            
-            # Default for strings
+            # Default for strings (URLs, emails and anything else)
             return "TEXT"
             
-        # For numeric types
+        # For numeric, boolean, JSON and date types
+        value_type = _VALUE_TYPES.get(type(value))
+        if value_type is not None:
+            return value_type
+        
+        # Subclasses such as pandas Timestamps need the slower isinstance checks
+        if isinstance(value, datetime.datetime):
+            return "TIMESTAMP"
+        if isinstance(value, datetime.date):
+            return "DATE"
+        if isinstance(value, bool):
+            return "BOOLEAN"
         if isinstance(value, int):
             return "INTEGER"
         if isinstance(value, float):
             return "FLOAT"
-        if isinstance(value, bool):
-            return "BOOLEAN"
-        if isinstance(value, (dict, list)):
-            return "JSONB"
-        
-        # Handle date objects
-        try:
-            import datetime
-            if isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
-                return "DATE"
-            if isinstance(value, datetime.datetime):
-                return "TIMESTAMP"
-        except ImportError:
-            pass
             
         # Default fallback
         return "TEXT"
@@ -754,19 +1245,17 @@ class DBManager:
             table_name (str): Name of the table
             column_name (str): Name of the column to delete
         """
-        if not self.pg_conn:
+        if self.pg_pool is None:
             status, message = self.connect_postgres()
             if not status:
                 return False, message
         
         try:
-            cursor = self.pg_conn.cursor()
-            query = f'ALTER TABLE {table_name} DROP COLUMN "{column_name}"'
-            cursor.execute(query)
-            self.pg_conn.commit()
-            cursor.close()
-            
-            return True, f"Column '{column_name}' deleted from table '{table_name}'"
+            with self._pg() as conn, conn.cursor() as cursor:
+                query = _alter_table_query("ALTER TABLE {} DROP COLUMN {}", table_name, column_name)
+                cursor.execute(query)
+                
+                return True, f"Column '{column_name}' deleted from table '{table_name}'"
         except Exception as e:
             return False, f"Error deleting column from PostgreSQL table: {str(e)}"
     
@@ -778,19 +1267,19 @@ class DBManager:
             old_column_name (str): Current name of the column
             new_column_name (str): New name for the column
         """
-        if not self.pg_conn:
+        if self.pg_pool is None:
             status, message = self.connect_postgres()
             if not status:
                 return False, message
         
         try:
-            cursor = self.pg_conn.cursor()
-            query = f'ALTER TABLE {table_name} RENAME COLUMN "{old_column_name}" TO "{new_column_name}"'
-            cursor.execute(query)
-            self.pg_conn.commit()
-            cursor.close()
-            
-            return True, f"Column in table '{table_name}' renamed from '{old_column_name}' to '{new_column_name}'"
+            with self._pg() as conn, conn.cursor() as cursor:
+                query = _alter_table_query(
+                    "ALTER TABLE {} RENAME COLUMN {} TO {}", table_name, old_column_name, new_column_name
+                )
+                cursor.execute(query)
+                
+                return True, f"Column in table '{table_name}' renamed from '{old_column_name}' to '{new_column_name}'"
         except Exception as e:
             return False, f"Error renaming column in PostgreSQL table: {str(e)}"
     
@@ -801,17 +1290,20 @@ class DBManager:
             old_table_name (str): Current name of the table
             new_table_name (str): New name for the table
         """
-        if not self.pg_conn:
+        if self.pg_pool is None:
             status, message = self.connect_postgres()
             if not status:
                 return False, message
         
         try:
-            cursor = self.pg_conn.cursor()
-            query = f'ALTER TABLE {old_table_name} RENAME TO {new_table_name}'
-            cursor.execute(query)
-            self.pg_conn.commit()
-            cursor.close()
+            with self._pg() as conn, conn.cursor() as cursor:
+                # The new name is folded like the old one, as if written unquoted
+                query = _alter_table_query(
+                    "ALTER TABLE {} RENAME TO {}", old_table_name, new_table_name.lower()
+                )
+                cursor.execute(query)
+            # Prepared statements would still point at the renamed table
+            self._invalidate_prepared()
             
             return True, f"Table renamed from '{old_table_name}' to '{new_table_name}'"
         except Exception as e:
@@ -825,25 +1317,76 @@ class DBManager:
             set_values (dict): Dictionary of column-value pairs to update
             condition (str): WHERE condition to identify rows to update
         """
-        if not self.pg_conn:
+        if self.pg_pool is None:
+            status, message = self.connect_postgres()
+            if not status:
+                return False, message
+        
+        try:
+            with self._pg() as conn, conn.cursor() as cursor:
+                # Format SET clause
+                set_clause = ", ".join([f'"{col}" = %s' for col in set_values.keys()])
+                values = list(set_values.values())
+                
+                # Literal % signs in the condition must not be read as placeholders
+                escaped_condition = condition.replace('%', '%%')
+                query = f"UPDATE {table_name} SET {set_clause} WHERE {escaped_condition}"
+                
+                # Same statement for the server-side prepared form
+                prepared_set_clause = ", ".join(
+                    [f'"{col}" = ${i}' for i, col in enumerate(set_values.keys(), start=1)]
+                )
+                prepared_query = f"UPDATE {table_name} SET {prepared_set_clause} WHERE {condition}"
+                
+                # Repeated updates are prepared once and then only executed
+                self._execute_auto_prepared(cursor, query, prepared_query, values)
+                updated_count = cursor.rowcount
+                
+                return True, f"{updated_count} rows updated in table '{table_name}'"
+        except Exception as e:
+            return False, f"Error updating rows in PostgreSQL table: {str(e)}"
+    
+    def postgres_update_rows(self, table_name, rows, key_column):
+        """Update many rows of a PostgreSQL table, each with its own values
+        
+        All updates share one parameterized statement and are sent in pages,
+        so N rows take about N / _PG_UPDATE_PAGE_ROWS round trips instead of N.
+        
+        Args:
+            table_name (str): Name of the table
+            rows (list): Dictionaries with the key column and the columns to
+                         set, all with the same keys
+            key_column (str): Column identifying the row to update
+        """
+        if self.pg_pool is None:
             status, message = self.connect_postgres()
             if not status:
                 return False, message
         
         try:
-            cursor = self.pg_conn.cursor()
+            if not rows:
+                return True, f"0 rows updated in table '{table_name}'"
+            
+            if any(row.keys() != rows[0].keys() for row in rows):
+                return False, "Error updating rows in PostgreSQL table: all rows must have the same columns"
+            if key_column not in rows[0]:
+                return False, f"Error updating rows in PostgreSQL table: rows are missing key column '{key_column}'"
             
-            # Format SET clause
-            set_clause = ", ".join([f'"{col}" = %s' for col in set_values.keys()])
-            values = list(set_values.values())
+            set_columns = [col for col in rows[0].keys() if col != key_column]
+            query = sql.SQL("UPDATE {} SET {} WHERE {} = %s").format(
+                _table_identifier(table_name),
+                sql.SQL(", ").join(
+                    sql.SQL("{} = %s").format(sql.Identifier(col)) for col in set_columns
+                ),
+                sql.Identifier(key_column)
+            )
+            params = [tuple(row[col] for col in set_columns) + (row[key_column],) for row in rows]
             
-            query = f"UPDATE {table_name} SET {set_clause} WHERE {condition}"
-            cursor.execute(query, values)
-            updated_count = cursor.rowcount
-            self.pg_conn.commit()
-            cursor.close()
+            with self._pg() as conn, conn.cursor() as cursor:
+                execute_batch(cursor, query, params, page_size=_PG_UPDATE_PAGE_ROWS)
             
-            return True, f"{updated_count} rows updated in table '{table_name}'"
+            # execute_batch only reports the row count of its last page
+            return True, f"Applied {len(rows)} row updates to table '{table_name}'"
         except Exception as e:
             return False, f"Error updating rows in PostgreSQL table: {str(e)}"
     
@@ -854,35 +1397,33 @@ class DBManager:
             query (str): SQL query to execute
             params (list, optional): Parameters for the query
         """
-        if not self.pg_conn:
+        if self.pg_pool is None:
             status, message = self.connect_postgres()
             if not status:
                 return False, message
         
         try:
-            # Detect if it's a SELECT query
-            is_select = query.strip().upper().startswith("SELECT")
-            
-            if is_select:
-                # For SELECT queries, return results as a DataFrame
-                if params:
-                    df = pd.read_sql_query(query, self.pg_conn, params=params)
-                else:
-                    df = pd.read_sql_query(query, self.pg_conn)
+            if _is_select(query):
+                # Plain SELECT queries stream into a DataFrame from a server-side cursor
+                with self._pg() as conn:
+                    df = self._read_frame(conn, query, params or None)
                 return True, df
-            else:
-                # For non-SELECT queries, execute and return affected rows
-                cursor = self.pg_conn.cursor()
-                if params:
-                    cursor.execute(query, params)
-                else:
-                    cursor.execute(query)
+            
+            with self._pg() as conn, conn.cursor() as cursor:
+                cursor.execute(query, params or None)
                 
-                affected_rows = cursor.rowcount
-                self.pg_conn.commit()
-                cursor.close()
+                # WITH, EXPLAIN, SHOW and ... RETURNING queries also return rows
+                if cursor.description is not None:
+                    columns = [desc[0] for desc in cursor.description]
+                    return True, pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
                 
-                return True, f"Query executed successfully. Affected rows: {affected_rows}"
+                # For other queries, return affected rows
+                affected_rows = cursor.rowcount
+            
+            # The query may have renamed or replaced tables behind prepared statements
+            self._invalidate_prepared()
+            
+            return True, f"Query executed successfully. Affected rows: {affected_rows}"
         except Exception as e:
             return False, f"Error executing SQL query: {str(e)}"
     
@@ -919,8 +1460,10 @@ class DBManager:
                 return False, message
         
         try:
-            collection = self.mongo_db[old_collection_name]
+            collection = self._coll(old_collection_name)
             collection.rename(new_collection_name)
+            self._mongo_collections.pop(old_collection_name, None)
+            self._mongo_collections.pop(new_collection_name, None)
             return True, f"Collection renamed from '{old_collection_name}' to '{new_collection_name}'"
         except Exception as e:
             return False, f"Error renaming MongoDB collection: {str(e)}"
@@ -939,13 +1482,35 @@ class DBManager:
                 return False, message
         
         try:
-            collection = self.mongo_db[collection_name]
+            collection = self._coll(collection_name)
             
-            # If update_data doesn't use MongoDB operators ($set, etc.), wrap it in $set
-            if not any(key.startswith('$') for key in update_data.keys()):
-                update_data = {'$set': update_data}
+            result = collection.update_many(filter_query, _as_update(update_data))
+            return True, f"{result.modified_count} documents updated in collection '{collection_name}'"
+        except Exception as e:
+            return False, f"Error updating documents in MongoDB collection: {str(e)}"
+    
+    def mongo_bulk_update(self, collection_name, operations):
+        """Apply many (filter, update) pairs to a MongoDB collection in one bulk write
+        
+        Args:
+            collection_name (str): Name of the collection
+            operations (list): List of (filter_query, update_data) tuples
+        """
+        if self.mongo_db is None:
+            status, message = self.connect_mongo()
+            if not status:
+                return False, message
+        
+        try:
+            from pymongo import UpdateMany
+            
+            requests = [UpdateMany(filter_query, _as_update(update_data))
+                        for filter_query, update_data in operations]
+            if not requests:
+                return True, f"0 documents updated in collection '{collection_name}'"
             
-            result = collection.update_many(filter_query, update_data)
+            # Unordered so the server can apply the updates without waiting on each other
+            result = self._coll(collection_name).bulk_write(requests, ordered=False)
             return True, f"{result.modified_count} documents updated in collection '{collection_name}'"
         except Exception as e:
             return False, f"Error updating documents in MongoDB collection: {str(e)}"
@@ -963,18 +1528,20 @@ class DBManager:
                 return False, message
         
         try:
-            collection = self.mongo_db[collection_name]
+            collection = self._coll(collection_name)
             
-            # Run the aggregation pipeline
-            result = list(collection.aggregate(pipeline))
+            # Run the aggregation pipeline, building the DataFrame as batches arrive
+            cursor = collection.aggregate(pipeline, batchSize=1000)
+            df = pd.DataFrame.from_records(cursor)
             
-            # Convert to DataFrame if possible
-            if result:
-                # Convert ObjectId to string for better display
-                result_str = json.loads(json_util.dumps(result))
-                df = pd.DataFrame(result_str)
-                return True, df
-            else:
+            if df.empty:
                 return True, "Aggregation returned no results"
+            
+            # Convert ObjectIds to string for better display, including ones
+            # nested in documents and arrays (e.g. from $lookup or $push)
+            from bson import ObjectId
+            for column in df.columns[df.dtypes == object]:
+                df[column] = df[column].map(lambda v: _stringify_object_ids(v, ObjectId))
+            return True, df
         except Exception as e:
             return False, f"Error running MongoDB aggregation: {str(e)}" 
\ No newline at end of file
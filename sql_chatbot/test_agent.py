@@ -0,0 +1,63 @@
+import pytest
+
+from agent import QueryAgent, _UNCLEAR_EXPLANATION
+
+
+@pytest.fixture
+def agent():
+    # Skip __init__, which creates the OpenAI client; these checks are local
+    agent = QueryAgent.__new__(QueryAgent)
+    agent._fast_path_hits = 0
+    agent._fast_path_misses = 0
+    return agent
+
+
+def test_validate_result_keeps_well_formed_result(agent):
+    result = {"operation": "view_table", "target": "users",
+              "parameters": {"limit": 5}, "explanation": "Viewing users"}
+    assert agent._validate_result(result) == result
+
+
+def test_validate_result_coerces_field_types(agent):
+    result = agent._validate_result({"operation": "view_table", "target": 5, "parameters": [1]})
+    assert result == {"operation": "view_table", "target": "", "parameters": {}, "explanation": ""}
+
+
+def test_validate_result_rejects_unknown_operations(agent):
+    for response in ({"operation": "drop_database"}, ["view_table"], {"operation": "unknown"}):
+        assert agent._validate_result(response) == {
+            "operation": "unknown", "explanation": _UNCLEAR_EXPLANATION
+        }
+    result = agent._validate_result({"operation": "unknown", "explanation": "Which table?"})
+    assert result == {"operation": "unknown", "explanation": "Which table?"}
+
+
+def test_fast_path_matches_simple_queries(agent):
+    assert agent._match_fast_path("Show all tables")["operation"] == "list_tables"
+    assert agent._match_fast_path("list collections in MongoDB.")["operation"] == "list_collections"
+    
+    result = agent._match_fast_path("count records in users")
+    assert (result["operation"], result["target"]) == ("count_records", "users")
+    result = agent._match_fast_path("count the documents in the orders collection")
+    assert (result["operation"], result["target"]) == ("count_documents", "orders")
+    result = agent._match_fast_path("view table orders")
+    assert (result["operation"], result["target"]) == ("view_table", "orders")
+    
+    result = agent._match_fast_path("rename table old_users to users")
+    assert result["operation"] == "rename_table"
+    assert result["target"] == "old_users"
+    assert result["parameters"] == {"new_name": "users"}
+
+
+def test_fast_path_leaves_other_queries_to_the_llm(agent):
+    assert agent._match_fast_path("show users where age > 30") is None
+    assert agent._match_fast_path("add a column email to customers") is None
+    assert agent._fast_path_misses == 2
+
+
+def test_is_upload_query(agent):
+    assert agent.is_upload_query("Upload a CSV")
+    assert agent.is_upload_query("import data from a file")
+    assert agent.is_upload_query("create from sales.csv")
+    assert not agent.is_upload_query("show important tables")
+    assert not agent.is_upload_query("view the profiles collection")
@@ -0,0 +1,120 @@
+import pandas as pd
+import pytest
+
+from db_utils import DBManager, _is_select, _row_limit, infer_type_from_name
+
+
+@pytest.fixture
+def db():
+    # No connection is opened until a database method needs one
+    return DBManager()
+
+
+def test_is_select_plain_statements():
+    assert _is_select("SELECT * FROM users")
+    assert _is_select("values (1), (2)")
+    assert _is_select("TABLE users")
+    assert not _is_select("UPDATE users SET name = 'a'")
+
+
+def test_is_select_skips_leading_whitespace_and_comments():
+    assert _is_select("   \n\tSELECT 1")
+    assert _is_select("-- latest users\nSELECT * FROM users")
+    assert _is_select("/* report */ /* multi\nline */ select 1")
+    assert not _is_select("-- SELECT 1\nDELETE FROM users")
+
+
+def test_is_select_parenthesised_query():
+    # Not declared as a server-side cursor; run_query still returns its rows
+    assert not _is_select("(SELECT 1)")
+    assert not _is_select(" " * 100 + "(SELECT 1)")
+
+
+def test_is_select_empty_query():
+    assert not _is_select("")
+    assert not _is_select(" " * 100)
+    assert not _is_select("-- only a comment")
+
+
+def test_infer_type_from_name_matches_whole_words():
+    for name in ("message", "page", "image", "language", "stage", "storage", "today"):
+        assert infer_type_from_name(name) == "TEXT", name
+
+
+def test_infer_type_from_name_last_word_decides():
+    assert infer_type_from_name("birthday") == "DATE"
+    assert infer_type_from_name("order_date") == "DATE"
+    assert infer_type_from_name("order_count") == "INTEGER"
+    assert infer_type_from_name("createdAt") == "TIMESTAMP"
+
+
+def test_infer_type_from_name_known_types():
+    for name in ("average", "percentage", "discount", "rating", "total", "latitude"):
+        assert infer_type_from_name(name) == "FLOAT", name
+    assert infer_type_from_name("score") == "INTEGER"
+    assert infer_type_from_name("metadata") == "JSONB"
+    assert infer_type_from_name("valid") == "BOOLEAN"
+    assert infer_type_from_name("zip code") == "TEXT"
+
+
+def test_infer_type_from_name_ids_and_flags():
+    assert infer_type_from_name("user_id") == "INTEGER"
+    assert infer_type_from_name("customerId") == "INTEGER"
+    assert infer_type_from_name("_id") == "INTEGER"
+    assert infer_type_from_name("is_active") == "BOOLEAN"
+    assert infer_type_from_name("hasAccess") == "BOOLEAN"
+    assert infer_type_from_name("") == "TEXT"
+
+
+def test_row_limit_falls_back_for_invalid_values():
+    assert _row_limit(50) == 50
+    assert _row_limit("20") == 20
+    for limit in (None, 0, -5, "all", [10]):
+        assert _row_limit(limit) == 100
+
+
+def test_infer_pg_type_from_dtype(db):
+    assert db._infer_pg_type(pd.Series([3, 7, 12])) == "INTEGER"
+    assert db._infer_pg_type(pd.Series([0, 1, 1])) == "BOOLEAN"
+    assert db._infer_pg_type(pd.Series([1.5, 2.0])) == "FLOAT"
+    assert db._infer_pg_type(pd.Series([True, False])) == "BOOLEAN"
+    assert db._infer_pg_type(pd.to_datetime(pd.Series(["2024-01-02"]))) == "TIMESTAMP"
+
+
+def test_infer_pg_type_from_string_values(db):
+    assert db._infer_pg_type(pd.Series(["yes", "No", None])) == "BOOLEAN"
+    assert db._infer_pg_type(pd.Series(["12", "40"], dtype=object)) == "INTEGER"
+    assert db._infer_pg_type(pd.Series(["1.5", "40"], dtype=object)) == "FLOAT"
+    assert db._infer_pg_type(pd.Series(["2024-01-02", "2024-03-04"])) == "DATE"
+    assert db._infer_pg_type(pd.Series(['{"a": 1}', "[1, 2]"])) == "JSONB"
+    assert db._infer_pg_type(pd.Series([{"a": 1}, [1, 2]])) == "JSONB"
+    assert db._infer_pg_type(pd.Series(["alice", "bob"])) == "TEXT"
+    assert db._infer_pg_type(pd.Series([None, None], dtype=object)) == "TEXT"
+
+
+def test_dataframe_conversions(db):
+    df = pd.DataFrame({
+        "n": [1, 2],
+        "f": [1.5, None],
+        "b": [True, False],
+        "when": ["2024-01-01", "2024-02-01"],
+        "flag": ["yes", "no"],
+        "doc": ['{"a": 1}', "[1]"],
+        "name": ["alice", "bob"],
+        "empty": [None, None],
+    })
+    assert db._dataframe_conversions(df) == {
+        "n": "numeric", "f": "numeric", "b": "boolean",
+        "when": "datetime", "flag": "boolean", "doc": "json",
+    }
+
+
+def test_process_dataframe_types_applies_conversions_to_later_chunks(db):
+    first = pd.DataFrame({"flag": ["yes", "no"], "doc": ['{"a": 1}', "[1]"]})
+    conversions = db._dataframe_conversions(first)
+    
+    later = db._process_dataframe_types(
+        pd.DataFrame({"flag": ["true", "maybe"], "doc": ['{"b": 2}', "oops"]}), conversions
+    )
+    assert later["flag"].tolist() == [True, None]
+    assert later["doc"].tolist() == [{"b": 2}, None]